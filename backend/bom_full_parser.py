@@ -1,22 +1,118 @@
+import os
 import pdfplumber
-import re
-
-
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import bom_parser
+
+# Maps uncommon whitespace to plain spaces so split()/join() can collapse runs
+# without running a regex per cell.
+_WS_TABLE = str.maketrans({c: " " for c in "\t\r\n\f\v\xa0"})
+
+# Parallelize only when the PDF is big enough to amortize worker startup.
+_PARALLEL_MIN_PAGES = 8
+_PAGES_PER_WORKER = 4
+
+# Column name -> header keywords, hoisted so the tuples are built once
+# instead of on every table.
+_COL_SPEC = (
+    ("FIND NUMBER", ("FIND",)),
+    ("REFERENCE DESIGNATOR", ("REFERENCE",)),
+    ("CATALOGUE NUMBER", ("CATALOGUE",)),
+    ("PART DESCRIPTION", ("PART DESCRIPTION",)),
+    ("QTY", ("QTY",)),
+    ("UNIT OF MEASURE", ("UNIT",)),
+    ("MAKE", ("MAKE",)),
+    ("INHOUSE/BOUGHT-OUT/COTS", ("INHOUSE", "COTS", "BOUGHT")),
+    ("LOCAL/IMPORT", ("LOCAL", "IMPORT")),
+)
+
+
+@lru_cache(maxsize=8192)
 def normalize(text):
+    # BOM cells repeat heavily (makes, units, "LOCAL"...), so cache hits
+    # skip the whole translate/upper/split pipeline.
     if not text:
         return ""
-    return re.sub(r"\s+", " ", text.strip().upper())
+    return " ".join(text.translate(_WS_TABLE).upper().split())
 
 
-def find_header_index(headers, keywords):
+def map_columns(headers):
     """
-    Find column index by keyword matching
+    Map all BOM columns in a single pass over the headers,
+    keeping the first matching index per column.
     """
+    col_map = {key: None for key, _ in _COL_SPEC}
     for i, h in enumerate(headers):
-        for k in keywords:
-            if k in h:
-                return i
-    return None
+        for key, keywords in _COL_SPEC:
+            if col_map[key] is None and any(k in h for k in keywords):
+                col_map[key] = i
+    return col_map
+
+
+def _collect_table(table, bom):
+    """
+    Pull full BOM records out of one extracted table, keyed by FIND NUMBER.
+    """
+    if not table or len(table) < 2:
+        return
+
+    headers = [normalize(h) for h in table[0]]
+
+    # Identify columns dynamically
+    col_map = map_columns(headers)
+
+    # FIND NUMBER & PART DESCRIPTION are mandatory
+    if col_map["FIND NUMBER"] is None or col_map["PART DESCRIPTION"] is None:
+        return
+
+    for row in table[1:]:
+        if not row:
+            continue
+
+        try:
+            find_no = row[col_map["FIND NUMBER"]]
+        except Exception:
+            continue
+
+        if not find_no:
+            continue
+
+        find_no = str(find_no).strip()
+
+        bom[find_no] = {
+            "FIND NUMBER": find_no,
+            "REFERENCE DESIGNATOR": normalize(row[col_map["REFERENCE DESIGNATOR"]]) if col_map["REFERENCE DESIGNATOR"] is not None else "",
+            "CATALOGUE NUMBER": normalize(row[col_map["CATALOGUE NUMBER"]]) if col_map["CATALOGUE NUMBER"] is not None else "",
+            "QTY": normalize(row[col_map["QTY"]]) if col_map["QTY"] is not None else "",
+            "UNIT OF MEASURE": normalize(row[col_map["UNIT OF MEASURE"]]) if col_map["UNIT OF MEASURE"] is not None else "",
+            "MAKE": normalize(row[col_map["MAKE"]]) if col_map["MAKE"] is not None else "",
+            "INHOUSE/BOUGHT-OUT/COTS": normalize(row[col_map["INHOUSE/BOUGHT-OUT/COTS"]]) if col_map["INHOUSE/BOUGHT-OUT/COTS"] is not None else "",
+            "LOCAL/IMPORT": normalize(row[col_map["LOCAL/IMPORT"]]) if col_map["LOCAL/IMPORT"] is not None else "",
+        }
+
+
+def _parse_page_range(pdf_path, page_numbers=None):
+    """
+    Parse one range of pages (1-indexed) in its own pdfplumber handle.
+    Used both serially and as a process-pool worker.
+    """
+    bom = {}
+
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
+        for page in pdf.pages:
+            try:
+                tables = page.extract_tables()
+            finally:
+                # Free pdfminer's per-page layout cache so memory stays
+                # bounded on large BOMs.
+                page.flush_cache()
+                page.close()
+
+            for table in tables:
+                _collect_table(table, bom)
+
+    return bom
 
 
 def parse_full_bom(pdf_path: str):
@@ -25,58 +121,115 @@ def parse_full_bom(pdf_path: str):
     Extracts remaining details keyed by FIND NUMBER.
     """
 
-    bom = {}
+    pdf_path = str(pdf_path)
 
     with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+
+    if total_pages < _PARALLEL_MIN_PAGES:
+        return _parse_page_range(pdf_path)
+
+    # Layout analysis is CPU-bound pure Python, so split page ranges
+    # across worker processes and merge in page order (last write wins,
+    # matching the serial dedup behaviour).
+    chunks = [
+        list(range(start, min(start + _PAGES_PER_WORKER, total_pages + 1)))
+        for start in range(1, total_pages + 1, _PAGES_PER_WORKER)
+    ]
+
+    bom = {}
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for partial in executor.map(_parse_page_range, [pdf_path] * len(chunks), chunks):
+            bom.update(partial)
+
+    return bom
+
+
+def _parse_all_page_range(pdf_path, page_numbers=None):
+    """
+    Worker: fill the simple (checklist) and full BOM dicts from the same
+    extracted tables, so each page is laid out only once.
+    """
+    simple = {}
+    full = {}
+
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
         for page in pdf.pages:
-            tables = page.extract_tables()
+            try:
+                # Locate tables first — cells are only extracted on pages
+                # that actually have line-drawn tables.
+                finder = page.find_tables(bom_parser._TABLE_SETTINGS)
+                if not finder.tables:
+                    continue
+                tables = [t.extract() for t in finder.tables]
+            finally:
+                # Free pdfminer's per-page layout cache so memory stays
+                # bounded on large BOMs.
+                page.flush_cache()
+                page.close()
 
             for table in tables:
-                if not table or len(table) < 2:
-                    continue
+                bom_parser._collect_table(table, simple)
+                _collect_table(table, full)
 
-                headers = [normalize(h) for h in table[0]]
-
-                # Identify columns dynamically
-                col_map = {
-                    "FIND NUMBER": find_header_index(headers, ["FIND"]),
-                    "REFERENCE DESIGNATOR": find_header_index(headers, ["REFERENCE"]),
-                    "CATALOGUE NUMBER": find_header_index(headers, ["CATALOGUE"]),
-                    "PART DESCRIPTION": find_header_index(headers, ["PART DESCRIPTION"]),
-                    "QTY": find_header_index(headers, ["QTY"]),
-                    "UNIT OF MEASURE": find_header_index(headers, ["UNIT"]),
-                    "MAKE": find_header_index(headers, ["MAKE"]),
-                    "INHOUSE/BOUGHT-OUT/COTS": find_header_index(headers, ["INHOUSE", "COTS", "BOUGHT"]),
-                    "LOCAL/IMPORT": find_header_index(headers, ["LOCAL", "IMPORT"]),
-                }
-
-                # FIND NUMBER & PART DESCRIPTION are mandatory
-                if col_map["FIND NUMBER"] is None or col_map["PART DESCRIPTION"] is None:
-                    continue
+    return simple, full
 
-                for row in table[1:]:
-                    if not row:
-                        continue
 
-                    try:
-                        find_no = row[col_map["FIND NUMBER"]]
-                    except Exception:
-                        continue
+def _parse_all_with_pymupdf(pdf_path):
+    """
+    Fast path: feed both collectors from PyMuPDF's native table finder,
+    one extraction per table. Empty dicts when nothing is detectable.
+    """
+    simple = {}
+    full = {}
 
-                    if not find_no:
-                        continue
+    with bom_parser.fitz.open(pdf_path) as doc:
+        for page in doc:
+            for tbl in page.find_tables().tables:
+                table = tbl.extract()
+                bom_parser._collect_table(table, simple)
+                _collect_table(table, full)
 
-                    find_no = str(find_no).strip()
+    return simple, full
 
-                    bom[find_no] = {
-                        "FIND NUMBER": find_no,
-                        "REFERENCE DESIGNATOR": normalize(row[col_map["REFERENCE DESIGNATOR"]]) if col_map["REFERENCE DESIGNATOR"] is not None else "",
-                        "CATALOGUE NUMBER": normalize(row[col_map["CATALOGUE NUMBER"]]) if col_map["CATALOGUE NUMBER"] is not None else "",
-                        "QTY": normalize(row[col_map["QTY"]]) if col_map["QTY"] is not None else "",
-                        "UNIT OF MEASURE": normalize(row[col_map["UNIT OF MEASURE"]]) if col_map["UNIT OF MEASURE"] is not None else "",
-                        "MAKE": normalize(row[col_map["MAKE"]]) if col_map["MAKE"] is not None else "",
-                        "INHOUSE/BOUGHT-OUT/COTS": normalize(row[col_map["INHOUSE/BOUGHT-OUT/COTS"]]) if col_map["INHOUSE/BOUGHT-OUT/COTS"] is not None else "",
-                        "LOCAL/IMPORT": normalize(row[col_map["LOCAL/IMPORT"]]) if col_map["LOCAL/IMPORT"] is not None else "",
-                    }
 
-    return bom
+def parse_all(pdf_path):
+    """
+    Parse checklist items and the full BOM in a single pass over the PDF,
+    halving the pdfminer layout work done when both are needed.
+    Tries PyMuPDF's C table finder first (like parse_bom_pdf) and falls
+    back to pdfplumber when it finds nothing.
+    Returns (items, full_bom) with the same shapes as parse_bom_pdf and
+    parse_full_bom.
+    """
+
+    pdf_path = str(pdf_path)
+
+    if bom_parser.fitz is not None:
+        try:
+            simple, full = _parse_all_with_pymupdf(pdf_path)
+        except Exception:
+            simple, full = {}, {}
+        if simple or full:
+            return bom_parser._to_sorted_list(simple), full
+
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+
+    if total_pages < _PARALLEL_MIN_PAGES:
+        simple, full = _parse_all_page_range(pdf_path)
+    else:
+        chunks = [
+            list(range(start, min(start + _PAGES_PER_WORKER, total_pages + 1)))
+            for start in range(1, total_pages + 1, _PAGES_PER_WORKER)
+        ]
+
+        simple, full = {}, {}
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for partial_simple, partial_full in executor.map(
+                _parse_all_page_range, [pdf_path] * len(chunks), chunks
+            ):
+                simple.update(partial_simple)
+                full.update(partial_full)
+
+    return bom_parser._to_sorted_list(simple), full
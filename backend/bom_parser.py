@@ -1,11 +1,40 @@
+import os
 import pdfplumber
 import re
-
-
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+# PyMuPDF's C table finder is 5-10x faster than pdfplumber's pure-Python
+# layout analysis; keep it optional so the pdfplumber path still works.
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+# Maps uncommon whitespace to plain spaces so split()/join() can collapse runs
+# without running a regex per cell.
+_WS_TABLE = str.maketrans({c: " " for c in "\t\r\n\f\v\xa0"})
+
+# Parallelize only when the PDF is big enough to amortize worker startup.
+_PARALLEL_MIN_PAGES = 8
+_PAGES_PER_WORKER = 4
+
+# BOM tables are ruled grids; constraining the finder to line strategies
+# lets graphics-heavy pages bail out before any cell extraction runs.
+_TABLE_SETTINGS = {
+    "vertical_strategy": "lines",
+    "horizontal_strategy": "lines",
+    "snap_tolerance": 4,
+}
+
+
+@lru_cache(maxsize=8192)
 def normalize(text):
+    # BOM cells repeat heavily (makes, units, "LOCAL"...), so cache hits
+    # skip the whole translate/upper/split pipeline.
     if not text:
         return ""
-    return re.sub(r"\s+", " ", text.strip().upper())
+    return " ".join(text.translate(_WS_TABLE).upper().split())
 
 
 def find_number_key(value):
@@ -22,53 +51,132 @@ def find_number_key(value):
     return int(match.group()) if match else 0
 
 
-def parse_bom_pdf(pdf_path: str):
+def _collect_table(table, items):
     """
-    Accurate BOM parser using TABLE-FIRST approach.
-    Extracts:
-      - FIND NUMBER
-      - PART DESCRIPTION
+    Pull FIND NUMBER / PART DESCRIPTION pairs out of one extracted table.
     """
+    if not table or len(table) < 2:
+        return
+
+    headers = [normalize(h) for h in table[0]]
+
+    if "FIND NUMBER" not in headers or "PART DESCRIPTION" not in headers:
+        return
+
+    find_idx = headers.index("FIND NUMBER")
+    desc_idx = headers.index("PART DESCRIPTION")
+
+    for row in table[1:]:
+        if not row or len(row) <= max(find_idx, desc_idx):
+            continue
 
+        find_no = row[find_idx]
+        desc = row[desc_idx]
+
+        if not find_no or not desc:
+            continue
+
+        find_no = str(find_no).strip()
+        desc = " ".join(desc.split())
+
+        # Deduplicate by find number; precompute the numeric sort key once
+        # here instead of re-parsing every key inside sorted().
+        items[find_no] = (find_number_key(find_no), desc)
+
+
+def _parse_page_range(pdf_path, page_numbers=None):
+    """
+    Parse one range of pages (1-indexed) in its own pdfplumber handle.
+    Used both serially and as a process-pool worker.
+    """
     items = {}
 
-    with pdfplumber.open(pdf_path) as pdf:
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
         for page in pdf.pages:
-            tables = page.extract_tables()
+            try:
+                # Locate tables first — cells are only extracted on pages
+                # that actually have line-drawn tables.
+                finder = page.find_tables(_TABLE_SETTINGS)
+                if not finder.tables:
+                    continue
+                tables = [t.extract() for t in finder.tables]
+            finally:
+                # Free pdfminer's per-page layout cache so memory stays
+                # bounded on large BOMs.
+                page.flush_cache()
+                page.close()
 
             for table in tables:
-                if not table or len(table) < 2:
-                    continue
+                _collect_table(table, items)
 
-                headers = [normalize(h) for h in table[0]]
+    return items
 
-                if "FIND NUMBER" not in headers or "PART DESCRIPTION" not in headers:
-                    continue
 
-                find_idx = headers.index("FIND NUMBER")
-                desc_idx = headers.index("PART DESCRIPTION")
+def _parse_with_pymupdf(pdf_path):
+    """
+    Fast-path parser on PyMuPDF's native table finder.
+    Returns the same {find_no: description} dict as the pdfplumber path;
+    empty when the PDF has no detectable tables (e.g. scanned drawings).
+    """
+    items = {}
+
+    with fitz.open(pdf_path) as doc:
+        for page in doc:
+            for tbl in page.find_tables().tables:
+                _collect_table(tbl.extract(), items)
+
+    return items
+
 
-                for row in table[1:]:
-                    if not row or len(row) <= max(find_idx, desc_idx):
-                        continue
+def parse_bom_pdf(pdf_path: str, backend: str = "auto"):
+    """
+    Accurate BOM parser using TABLE-FIRST approach.
+    Extracts:
+      - FIND NUMBER
+      - PART DESCRIPTION
+
+    backend: "auto" tries PyMuPDF first (when installed) and falls back
+    to pdfplumber if nothing is found; "pdfplumber" forces the slow path.
+    """
+
+    pdf_path = str(pdf_path)
+
+    if backend == "auto" and fitz is not None:
+        try:
+            items = _parse_with_pymupdf(pdf_path)
+        except Exception:
+            items = {}
+        if items:
+            return _to_sorted_list(items)
+
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
 
-                    find_no = row[find_idx]
-                    desc = row[desc_idx]
+    if total_pages < _PARALLEL_MIN_PAGES:
+        items = _parse_page_range(pdf_path)
+    else:
+        # Layout analysis is CPU-bound pure Python, so split page ranges
+        # across worker processes and merge in page order (last write wins,
+        # matching the serial dedup behaviour).
+        chunks = [
+            list(range(start, min(start + _PAGES_PER_WORKER, total_pages + 1)))
+            for start in range(1, total_pages + 1, _PAGES_PER_WORKER)
+        ]
 
-                    if not find_no or not desc:
-                        continue
+        items = {}
+        with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+            for partial in executor.map(_parse_page_range, [pdf_path] * len(chunks), chunks):
+                items.update(partial)
 
-                    find_no = str(find_no).strip()
-                    desc = re.sub(r"\s+", " ", desc.strip())
+    return _to_sorted_list(items)
 
-                    # Deduplicate by find number
-                    items[find_no] = desc
 
-    # Convert to sorted list (robust against '10.', '10A', etc.)
+def _to_sorted_list(items):
+    # Sort on the precomputed numeric key (robust against '10.', '10A', etc.)
     return [
         {
             "find_number": k,
-            "part_description": v
+            "part_description": desc
         }
-        for k, v in sorted(items.items(), key=lambda x: find_number_key(x[0]))
+        for k, (_, desc) in sorted(items.items(), key=lambda x: x[1][0])
     ]
@@ -28,7 +28,9 @@ def save_ga(session_base: Path, file: UploadFile) -> str:
 
     ga_path = ga_dir / file.filename
     with open(ga_path, "wb") as f:
-        shutil.copyfileobj(file.file, f)
+        # 1 MiB buffer: a 200 MB GA PDF takes ~200 write syscalls instead
+        # of ~12k with the default 16 KB chunks.
+        shutil.copyfileobj(file.file, f, length=1024 * 1024)
 
     return ga_path.name
 
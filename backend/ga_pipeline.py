@@ -11,16 +11,74 @@ import cv2
 import numpy as np
 import time
 import json
+import queue
+import struct
 import hashlib
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
 from pathlib import Path
 from datetime import datetime
 
-from pdf2image import convert_from_path
+import pypdfium2 as pdfium
+
+import ga_render
 from ultralytics import YOLO
 from PIL import Image
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    LogitsProcessor,
+    LogitsProcessorList,
+)
+
+# Cheap digit OCR used before falling back to the VLM.
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+# orjson serializes the multi-MB checkpoint/result payloads 5-10x faster
+# than stdlib json; fall back transparently when not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dump(obj, path):
+    """Write obj as indented JSON, via orjson when available."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=2)
+
+
+def _json_load(path):
+    """Read a JSON file, via orjson when available."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def _jsonl_load(path):
+    """Read a JSON Lines file into a list, via orjson when available."""
+    loads = orjson.loads if orjson is not None else json.loads
+    with open(path, "rb") as f:
+        return [loads(line) for line in f if line.strip()]
+
+
+def _jsonl_line(obj):
+    """Serialize one object as a JSONL line (bytes)."""
+    if orjson is not None:
+        return orjson.dumps(obj) + b"\n"
+    return json.dumps(obj).encode() + b"\n"
 
 # ===============================
 # CONFIGURATION
@@ -33,18 +91,117 @@ MODEL_REVISION = "2025-01-09"
 USE_GPU = torch.cuda.is_available()
 DEVICE = torch.device("cuda" if USE_GPU else "cpu")
 
+if USE_GPU:
+    # Page batches share one shape per run, so let cudnn benchmark its
+    # algo choice once and reuse it for every subsequent batch.
+    torch.backends.cudnn.benchmark = True
+
+# Raster cost is O(DPI^2); balloon circles are large enough to detect at
+# half resolution, so YOLO sees a downscaled page while Moondream crops
+# and the saved viewer JPEGs stay at full DPI.
+DETECT_SCALE = 0.5
+
+# Pages per batched YOLO forward pass; amortizes kernel-launch and
+# cudnn-algo-selection overhead across pages.
+YOLO_BATCH = 4
+
+# Rendered pages kept in memory between Stage 1 and Stage 2 so fresh runs
+# skip the JPEG encode->decode round-trip. Bounded because a 300 DPI page
+# is ~100 MB; pages beyond the cap fall back to cv2.imread.
+PAGE_CACHE_MAX = 2 * YOLO_BATCH
+
+# Rasterize via a process pool only when the PDF is big enough to
+# amortize worker startup (mirrors the BOM parsers' threshold scheme).
+RENDER_PARALLEL_MIN = 2 * YOLO_BATCH
+RENDER_PAGES_PER_WORKER = 4
+
+# Crops per batched Moondream call; bounds activation memory on
+# balloon-dense pages while still amortizing launch overhead.
+VLM_BATCH = 16
+
+# Detection gates (full-resolution pixels). OCR cost per crop is roughly
+# constant, so slivers and low-confidence noise boxes are dropped before
+# they reach Tesseract/Moondream — they almost never parse to a digit.
+MIN_BOX_CONF = 0.35
+MIN_BOX_SIDE = 16
+MIN_BOX_AREA = 400
+MAX_BOX_ASPECT = 3.0
+
 print(f"🖥️  GA Pipeline running on: {DEVICE}")
 
 # ===============================
 # LOAD MODELS (ONCE PER PROCESS)
 # ===============================
+def _load_yolo_model():
+    """
+    Load YOLO, preferring a cached TensorRT FP16 engine on CUDA hosts.
+    The engine is exported once next to the .pt checkpoint and reused on
+    later startups; any export/load failure falls back to the .pt model.
+    """
+    if USE_GPU:
+        engine_path = Path(YOLO_MODEL_PATH).with_suffix(".engine")
+        try:
+            if not engine_path.exists():
+                print("🔄 Exporting YOLO TensorRT FP16 engine (one-time)...")
+                YOLO(YOLO_MODEL_PATH).export(
+                    format="engine",
+                    half=True,
+                    device=0,
+                    dynamic=True,
+                    batch=YOLO_BATCH,
+                )
+            return YOLO(str(engine_path))
+        except Exception as e:
+            print(f"⚠️ TensorRT engine unavailable ({e}), using PyTorch weights")
+
+    return YOLO(YOLO_MODEL_PATH)
+
+
 print("🔄 Loading YOLO model...")
-yolo_model = YOLO(YOLO_MODEL_PATH)
+yolo_model = _load_yolo_model()
 print("✅ YOLO model loaded")
 
 print(f"🔄 Loading Moondream model on {DEVICE}...")
 
-if USE_GPU:
+# Optional weight quantization via bitsandbytes: "nf4" cuts weight
+# memory/bandwidth ~4x vs fp16; "int8" halves it and is the safer pick
+# when 4-bit hurts digit accuracy (the vision encoder stays fp16 in
+# either mode). Disabled automatically when bitsandbytes is missing.
+MOONDREAM_QUANT = os.environ.get("MOONDREAM_QUANT", "nf4" if USE_GPU else "none")
+
+_quant_config = None
+if USE_GPU and MOONDREAM_QUANT in ("nf4", "int8"):
+    try:
+        import bitsandbytes  # noqa: F401 - probe availability
+        from transformers import BitsAndBytesConfig
+
+        if MOONDREAM_QUANT == "nf4":
+            _quant_config = BitsAndBytesConfig(
+                load_in_4bit=True,
+                bnb_4bit_quant_type="nf4",
+                bnb_4bit_compute_dtype=torch.float16,
+            )
+            print("   ↳ Quantization: 4-bit NF4 (bitsandbytes)")
+        else:
+            _quant_config = BitsAndBytesConfig(
+                load_in_8bit=True,
+                llm_int8_skip_modules=["vision_encoder"],
+            )
+            print("   ↳ Quantization: 8-bit weight-only (bitsandbytes)")
+    except ImportError:
+        print("   ↳ bitsandbytes not installed, loading fp16 weights")
+
+if USE_GPU and _quant_config is not None:
+    # bitsandbytes places quantized weights itself; no .to(DEVICE) here.
+    vlm_model = AutoModelForCausalLM.from_pretrained(
+        MODEL_ID,
+        trust_remote_code=True,
+        revision=MODEL_REVISION,
+        torch_dtype=torch.float16,
+        quantization_config=_quant_config,
+        device_map="auto",
+    )
+elif USE_GPU:
     vlm_model = AutoModelForCausalLM.from_pretrained(
         MODEL_ID,
         trust_remote_code=True,
@@ -67,12 +224,129 @@ vlm_tokenizer = AutoTokenizer.from_pretrained(
 
 vlm_model.eval()
 
+
+class _DigitLogitsProcessor(LogitsProcessor):
+    """Masks every generated token except single digits and EOS."""
+
+    def __init__(self, allowed_ids):
+        self._allowed = list(allowed_ids)
+
+    def __call__(self, input_ids, scores):
+        masked = torch.full_like(scores, float("-inf"))
+        masked[:, self._allowed] = scores[:, self._allowed]
+        return masked
+
+
+def _digit_generation_kwargs():
+    """
+    Generation kwargs that stop the decoder from narrating ("The number
+    in the circle is...") — decode cost is linear in generated tokens,
+    and a balloon answer only needs digits + EOS within 4 tokens.
+    """
+    try:
+        allowed = {
+            vlm_tokenizer.encode(d, add_special_tokens=False)[0]
+            for d in "0123456789"
+        }
+        if vlm_tokenizer.eos_token_id is not None:
+            allowed.add(vlm_tokenizer.eos_token_id)
+        return {
+            "max_new_tokens": 4,
+            "do_sample": False,
+            "logits_processor": LogitsProcessorList(
+                [_DigitLogitsProcessor(sorted(allowed))]
+            ),
+        }
+    except Exception:
+        return {}
+
+
+_DIGIT_GEN_KWARGS = _digit_generation_kwargs()
+
 print("✅ Moondream model loaded")
 print(f"   ↳ Model device: {next(vlm_model.parameters()).device}")
 
 # ===============================
 # HELPER: READ NUMBER FROM CIRCLE
 # ===============================
+def _digits_or_none(answer):
+    """Extract the numeric part of a VLM answer, or None."""
+    if not answer:
+        return None
+    digits = "".join(filter(str.isdigit, answer))
+    return int(digits) if digits else None
+
+
+# Single-character page segmentation, digits only.
+_TESSERACT_CONFIG = "--psm 10 -c tessedit_char_whitelist=0123456789"
+
+
+def predict_number_tesseract(crop_img):
+    """
+    Read a balloon number with Tesseract — orders of magnitude cheaper
+    than a VLM forward pass for a 1-3 digit crop. Returns int or None;
+    None routes the crop to the Moondream fallback.
+    """
+    if pytesseract is None or crop_img is None or crop_img.size == 0:
+        return None
+
+    try:
+        gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
+        # Upscale small crops so strokes survive binarization
+        if gray.shape[0] < 64 or gray.shape[1] < 64:
+            gray = cv2.resize(gray, (64, 64), interpolation=cv2.INTER_CUBIC)
+        _, binary = cv2.threshold(
+            gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU
+        )
+
+        answer = pytesseract.image_to_string(binary, config=_TESSERACT_CONFIG)
+        return _digits_or_none(answer)
+    except Exception:
+        return None
+
+
+def _sdpa_ctx():
+    """
+    Fused flash/mem-efficient attention context on CUDA; no-op elsewhere
+    or when the running torch build lacks the sdp_kernel toggle.
+    """
+    if USE_GPU:
+        try:
+            return torch.backends.cuda.sdp_kernel(
+                enable_flash=True,
+                enable_mem_efficient=True,
+                enable_math=False,
+            )
+        except Exception:
+            pass
+    return nullcontext()
+
+
+def _bgr_to_pil(crop_img):
+    """
+    BGR crop -> PIL RGB with a single contiguous copy (numpy channel
+    reversal) instead of a cv2.cvtColor allocation plus PIL wrap.
+    """
+    return Image.fromarray(np.ascontiguousarray(crop_img[:, :, ::-1]))
+
+
+# Moondream's ViT input edge; crops are resized to this before PIL so
+# the scaling runs through cv2's SIMD kernels instead of PIL inside the
+# model's preprocessing, and every image in a batch shares one shape.
+VLM_INPUT_SIZE = 378
+
+
+def _crop_to_vlm_pil(crop_img):
+    """Resize a crop to the ViT input size, then convert to PIL RGB."""
+    h, w = crop_img.shape[:2]
+    if (h, w) != (VLM_INPUT_SIZE, VLM_INPUT_SIZE):
+        interp = cv2.INTER_AREA if h > VLM_INPUT_SIZE else cv2.INTER_CUBIC
+        crop_img = cv2.resize(
+            crop_img, (VLM_INPUT_SIZE, VLM_INPUT_SIZE), interpolation=interp
+        )
+    return _bgr_to_pil(crop_img)
+
+
 def predict_number_single(crop_img, is_cancelled_func=None):
     """
     Extract number from a cropped balloon using Moondream.
@@ -85,32 +359,35 @@ def predict_number_single(crop_img, is_cancelled_func=None):
         if is_cancelled_func and is_cancelled_func():
             return None
 
-        # Convert to PIL
-        pil_img = Image.fromarray(
-            cv2.cvtColor(crop_img, cv2.COLOR_BGR2RGB)
-        )
+        # Convert to PIL at the ViT input size
+        pil_img = _crop_to_vlm_pil(crop_img)
 
         prompt = "Number in circle:"
 
-        # Encode image
-        enc_image = vlm_model.encode_image(pil_img)
+        with torch.inference_mode(), _sdpa_ctx():
+            # Encode image
+            enc_image = vlm_model.encode_image(pil_img)
 
-        if is_cancelled_func and is_cancelled_func():
-            return None
-
-        # Ask VLM
-        answer = vlm_model.answer_question(
-            enc_image,
-            prompt,
-            vlm_tokenizer
-        )
+            if is_cancelled_func and is_cancelled_func():
+                return None
 
-        # Extract digits only
-        digits = "".join(filter(str.isdigit, answer))
-        if not digits:
-            return None
+            # Ask VLM, constrained to digit/EOS tokens where supported
+            try:
+                answer = vlm_model.answer_question(
+                    enc_image,
+                    prompt,
+                    vlm_tokenizer,
+                    **_DIGIT_GEN_KWARGS
+                )
+            except TypeError:
+                # Model snapshot without generate-kwarg passthrough
+                answer = vlm_model.answer_question(
+                    enc_image,
+                    prompt,
+                    vlm_tokenizer
+                )
 
-        return int(digits)
+        return _digits_or_none(answer)
 
     except Exception:
         # Silent fail on individual balloons
@@ -119,16 +396,186 @@ def predict_number_single(crop_img, is_cancelled_func=None):
         return None
 
 
+def _predict_numbers_vlm(crops, is_cancelled_func=None):
+    """
+    Read crops through Moondream — batched in one forward pass when the
+    loaded revision has a batch API, per-crop otherwise.
+    Returns a list of int|None aligned with crops.
+    """
+    if not crops:
+        return []
+
+    if is_cancelled_func and is_cancelled_func():
+        return [None] * len(crops)
+
+    prompt = "Number in circle:"
+
+    if hasattr(vlm_model, "batch_answer"):
+        try:
+            answers = []
+            # Chunk dense pages so activation memory stays bounded
+            for start in range(0, len(crops), VLM_BATCH):
+                if is_cancelled_func and is_cancelled_func():
+                    answers.extend([None] * (len(crops) - len(answers)))
+                    break
+                pil_imgs = [_crop_to_vlm_pil(c) for c in crops[start:start + VLM_BATCH]]
+                with torch.inference_mode(), _sdpa_ctx():
+                    try:
+                        answers.extend(vlm_model.batch_answer(
+                            images=pil_imgs,
+                            prompts=[prompt] * len(pil_imgs),
+                            tokenizer=vlm_tokenizer,
+                            **_DIGIT_GEN_KWARGS
+                        ))
+                    except TypeError:
+                        answers.extend(vlm_model.batch_answer(
+                            images=pil_imgs,
+                            prompts=[prompt] * len(pil_imgs),
+                            tokenizer=vlm_tokenizer,
+                        ))
+            return [_digits_or_none(a) for a in answers]
+        except Exception:
+            pass  # fall through to the per-crop path
+
+    return [
+        predict_number_single(c, is_cancelled_func=is_cancelled_func)
+        for c in crops
+    ]
+
+
+def _crop_key(crop_img):
+    """Digest of a crop's pixels, used to key the per-session answer cache."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(struct.pack("<qq", crop_img.shape[0], crop_img.shape[1]))
+    h.update(np.ascontiguousarray(crop_img).tobytes())
+    return h.hexdigest()
+
+
+def predict_numbers_batch(crops, answer_cache=None, is_cancelled_func=None):
+    """
+    Read the numbers from a page's worth of balloon crops.
+    Tesseract handles the easy crops for near-zero cost; only the ones it
+    cannot read are routed to the (batched) Moondream fallback.
+    When answer_cache is given (a {crop digest: number} dict), crops
+    already read by an earlier partial run are answered from it, and new
+    answers are written back so a re-run after a mid-page interruption
+    skips the OCR/VLM work it has already paid for.
+    Returns a list of int|None aligned with crops.
+    """
+    if answer_cache is not None:
+        keys = [_crop_key(c) for c in crops]
+        numbers = [answer_cache.get(k) for k in keys]
+    else:
+        keys = None
+        numbers = [None] * len(crops)
+
+    for i, n in enumerate(numbers):
+        if n is None:
+            numbers[i] = predict_number_tesseract(crops[i])
+
+    pending = [i for i, n in enumerate(numbers) if n is None]
+    if pending:
+        vlm_numbers = _predict_numbers_vlm(
+            [crops[i] for i in pending],
+            is_cancelled_func=is_cancelled_func
+        )
+        for i, n in zip(pending, vlm_numbers):
+            numbers[i] = n
+
+    if keys is not None:
+        for k, n in zip(keys, numbers):
+            if n is not None:
+                answer_cache[k] = n
+
+    return numbers
+
+
+# ===============================
+# PDF RASTERIZATION
+# ===============================
+def render_pdf_pages(pdf_path, ga_images_dir: Path, dpi: int,
+                     skip_existing: bool = False, page_cache: dict = None) -> int:
+    """
+    Rasterize all pages of the PDF straight to BGR JPEGs via pypdfium2.
+    PDFium renders in-process to a numpy buffer, so there is no Poppler
+    subprocess, temp file, or RGB->BGR conversion copy.
+    Large PDFs are split into page-range chunks across a process pool
+    (render + JPEG encode are both CPU-bound); the workers live in
+    ga_render so they never import this module's models. Small PDFs stay
+    serial, where page_cache (when given) keeps the first PAGE_CACHE_MAX
+    rendered arrays keyed by page number so Stage 2 can skip re-decoding
+    the JPEGs it just wrote.
+    Returns the total page count.
+    """
+    total_pages = ga_render.page_count(pdf_path)
+
+    if total_pages >= RENDER_PARALLEL_MIN:
+        chunks = [
+            list(range(start, min(start + RENDER_PAGES_PER_WORKER, total_pages + 1)))
+            for start in range(1, total_pages + 1, RENDER_PAGES_PER_WORKER)
+        ]
+
+        with ProcessPoolExecutor(max_workers=min(os.cpu_count() or 1, len(chunks))) as executor:
+            futures = [
+                executor.submit(
+                    ga_render.render_page_range,
+                    str(pdf_path), chunk, dpi, str(ga_images_dir), skip_existing,
+                )
+                for chunk in chunks
+            ]
+            for future in futures:
+                future.result()
+
+        return total_pages
+
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        for page_index in range(1, total_pages + 1):
+            image_path = ga_images_dir / f"page_{page_index}.jpg"
+
+            if skip_existing and image_path.exists():
+                continue
+
+            page_img = ga_render.render_page(pdf, page_index, dpi)
+
+            cv2.imwrite(
+                str(image_path),
+                page_img,
+                [int(cv2.IMWRITE_JPEG_QUALITY), ga_render.JPEG_QUALITY],
+            )
+
+            if page_cache is not None and len(page_cache) < PAGE_CACHE_MAX:
+                page_cache[page_index] = page_img
+    finally:
+        pdf.close()
+
+    return total_pages
+
+
 # ===============================
 # ✅ NEW: RESUME HELPERS
 # ===============================
 def calculate_file_hash(pdf_path: Path) -> str:
-    """Calculate MD5 hash of PDF file for identification."""
-    hash_md5 = hashlib.md5()
+    """
+    Cheap content fingerprint used to key the resume checkpoints.
+    Hashes size + the first/last 64 KB instead of streaming the whole
+    PDF through MD5, so the cost stays O(1) in file size. Deliberately
+    no mtime: every upload lands as a freshly written file, and the
+    fingerprint must survive re-uploading the same PDF or resume would
+    never trigger.
+    """
+    st = os.stat(pdf_path)
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(struct.pack("<q", st.st_size))
+
     with open(pdf_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
+        h.update(f.read(65536))
+        if st.st_size > 131072:
+            f.seek(-65536, os.SEEK_END)
+            h.update(f.read(65536))
+
+    return h.hexdigest()
 
 
 def load_resume_state(session_base: Path, file_hash: str):
@@ -137,22 +584,20 @@ def load_resume_state(session_base: Path, file_hash: str):
     Returns: (start_page, existing_results, total_pages) or (1, [], None)
     """
     progress_file = session_base / f"ga_progress_{file_hash}.json"
-    partial_results_file = session_base / f"balloon_results_partial_{file_hash}.json"
-    
+    partial_results_file = session_base / f"balloon_results_partial_{file_hash}.jsonl"
+
     if not progress_file.exists() or not partial_results_file.exists():
         return 1, [], None
-    
+
     try:
-        with open(progress_file, 'r') as f:
-            progress = json.load(f)
-        
+        progress = _json_load(progress_file)
+
         # Don't resume if already completed
         if progress.get("completed"):
             return 1, [], None
-        
-        with open(partial_results_file, 'r') as f:
-            existing_results = json.load(f)
-        
+
+        existing_results = _jsonl_load(partial_results_file)
+
         start_page = progress['last_page'] + 1
         total_pages = progress['total_pages']
         
@@ -171,15 +616,15 @@ def load_resume_state(session_base: Path, file_hash: str):
         return 1, [], None
 
 
-def save_checkpoint(session_base: Path, file_hash: str, page_num: int, 
-                   total_pages: int, results: list):
+def save_checkpoint(session_base: Path, file_hash: str, page_num: int,
+                    total_pages: int, results: list):
     """
-    Save progress checkpoint after processing a page.
+    Save the progress metadata after processing a page. Partial results
+    live in an append-only JSONL next to this file (see _CheckpointWriter)
+    so they are never rewritten.
     """
     progress_file = session_base / f"ga_progress_{file_hash}.json"
-    partial_results_file = session_base / f"balloon_results_partial_{file_hash}.json"
-    
-    # Save progress metadata
+
     progress_data = {
         "file_hash": file_hash,
         "total_pages": total_pages,
@@ -190,39 +635,119 @@ def save_checkpoint(session_base: Path, file_hash: str, page_num: int,
         "last_update": str(datetime.now()),
         "completed": False
     }
-    
-    with open(progress_file, 'w') as f:
-        json.dump(progress_data, f, indent=2)
-    
-    # Save partial results
-    with open(partial_results_file, 'w') as f:
-        json.dump(results, f, indent=2)
-    
+
+    # Write-then-rename so an interrupted write never corrupts the
+    # checkpoint a later resume would read.
+    tmp = progress_file.with_suffix(".tmp")
+    _json_dump(progress_data, tmp)
+    os.replace(tmp, progress_file)
+
     print(f"💾 Checkpoint saved: {page_num}/{total_pages} pages, {len(results)} balloons")
 
 
+class _CheckpointWriter:
+    """
+    Background checkpoint writer. The page loop enqueues snapshots and a
+    daemon thread does the JSON serialization and disk writes, so per-page
+    checkpoints no longer sit on the hot path in front of the next YOLO
+    batch. Partial results are appended to a JSONL file — only the
+    balloons new since the last snapshot are serialized, so total
+    checkpoint I/O is O(N) in balloons instead of O(N^2).
+    """
+
+    _SENTINEL = object()
+
+    def __init__(self, session_base: Path, file_hash: str,
+                 already_written: int = 0):
+        self.session_base = session_base
+        self.file_hash = file_hash
+        # Append only when genuinely resuming; a fresh start truncates,
+        # since a stale partial file (completed or corrupt prior run)
+        # would otherwise be resumed with duplicate balloons later.
+        mode = "ab" if already_written else "wb"
+        self._partial_file = open(
+            session_base / f"balloon_results_partial_{file_hash}.jsonl", mode
+        )
+        # Balloons already on disk from a previous partial run
+        self._written = already_written
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, page_num: int, total_pages: int, results: list):
+        # Snapshot the list itself; the result dicts are never mutated
+        # after append, so a shallow copy is enough.
+        self._queue.put((page_num, total_pages, list(results)))
+
+    def close(self):
+        """Flush the last snapshot and stop the writer thread."""
+        self._queue.put(self._SENTINEL)
+        self._thread.join()
+        if not self._partial_file.closed:
+            self._partial_file.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+
+            # Drain to the newest snapshot; skipped ones carry strictly
+            # fewer appended balloons, so nothing is lost.
+            while True:
+                try:
+                    newer = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if newer is self._SENTINEL:
+                    if item is not self._SENTINEL:
+                        self._write(item)
+                    return
+                item = newer
+
+            if item is self._SENTINEL:
+                return
+
+            self._write(item)
+
+    def _write(self, item):
+        page_num, total_pages, results = item
+        try:
+            if len(results) > self._written:
+                for balloon in results[self._written:]:
+                    self._partial_file.write(_jsonl_line(balloon))
+                self._partial_file.flush()
+                self._written = len(results)
+
+            save_checkpoint(
+                self.session_base, self.file_hash,
+                page_num, total_pages, results
+            )
+        except Exception as e:
+            print(f"⚠️ Checkpoint write failed: {e}")
+
+
 def mark_complete(session_base: Path, file_hash: str):
     """
     Mark processing as complete and clean up partial files.
     """
     progress_file = session_base / f"ga_progress_{file_hash}.json"
-    partial_results_file = session_base / f"balloon_results_partial_{file_hash}.json"
-    
+    partial_results_file = session_base / f"balloon_results_partial_{file_hash}.jsonl"
+
     # Mark progress as complete
     if progress_file.exists():
         try:
-            with open(progress_file, 'r') as f:
-                progress_data = json.load(f)
-            
+            progress_data = _json_load(progress_file)
+
             progress_data["completed"] = True
             progress_data["status"] = "complete"
             progress_data["completed_at"] = str(datetime.now())
-            
-            with open(progress_file, 'w') as f:
-                json.dump(progress_data, f, indent=2)
+
+            _json_dump(progress_data, progress_file)
         except:
             pass
     
+    # The per-crop answer cache only matters while a run can be resumed
+    (session_base / f"ga_answers_{file_hash}.json").unlink(missing_ok=True)
+
     # Note: We keep the partial results file until cache is saved
     # It will be cleaned up by the main.py after caching
 
@@ -234,22 +759,26 @@ def process_ga_pdf(
     pdf_path: str,
     dpi: int = 300,
     status_file: Path = None,
-    is_cancelled_func=None
+    is_cancelled_func=None,
+    on_status=None
 ):
     """
     Process GA PDF and extract balloon numbers + bounding boxes.
     Progress scale: 0 → 100
-    
+
     ✅ ENHANCED: Now supports resume from interruption
     - Saves checkpoint after each page
     - Resumes from last completed page if interrupted
     - Merges previous results with new results
-    
+
     Args:
         pdf_path: Path to the GA PDF
         dpi: Resolution for PDF to image conversion
         status_file: Path to JSON file for progress updates
         is_cancelled_func: Function that returns True if processing should stop
+        on_status: Optional callable given each status payload dict, for
+            callers that publish progress in memory instead of polling
+            the status file
     """
 
     pdf_path = Path(pdf_path)
@@ -266,29 +795,73 @@ def process_ga_pdf(
     # Track if we're resuming
     is_resuming = start_page > 1
 
+    # Fresh renders land here so Stage 2 avoids re-reading its own JPEGs
+    page_cache = {}
+
+    # Balloon numbers read by earlier partial runs, keyed by crop digest,
+    # so a crash mid-page doesn't re-pay OCR/VLM for crops already done
+    answer_cache_file = session_base / f"ga_answers_{file_hash}.json"
+    try:
+        answer_cache = _json_load(answer_cache_file) if answer_cache_file.exists() else {}
+    except Exception:
+        answer_cache = {}
+    answers_persisted = len(answer_cache)
+
     # -------------------------------
     # Progress updater (writes to file)
     # -------------------------------
-    def update_status(progress, message):
-        """Update progress status to JSON file"""
+    # Status polling only needs sub-second freshness; throttle to 5 Hz so
+    # dense pages don't turn progress updates into thousands of writes.
+    last_status_write = 0.0
+
+    def update_status(progress, message, status='processing'):
+        """Update progress status (throttled; in-memory + file)"""
+        nonlocal last_status_write
+        if not status_file and on_status is None:
+            return
+
+        now = time.monotonic()
+        # Terminal updates (cancel/error at 0, completion at 99+)
+        # always land; intermediate ones are rate-limited.
+        if 0 < progress < 99 and now - last_status_write < 0.2:
+            return
+
+        payload = {
+            'status': status,
+            'progress': int(min(progress, 99)),  # Cap at 99 during processing
+            'message': message
+        }
+
+        if on_status is not None:
+            try:
+                on_status(payload)
+            except Exception as e:
+                print(f"⚠️  Status callback failed: {e}")
+
         if status_file:
             try:
-                with open(status_file, 'w') as f:
-                    json.dump({
-                        'status': 'processing',
-                        'progress': int(min(progress, 99)),  # Cap at 99 during processing
-                        'message': message
-                    }, f)
+                tmp = status_file.with_suffix(".tmp")
+                with open(tmp, 'w') as f:
+                    json.dump(payload, f)
+                os.replace(tmp, status_file)
                 print(f"📊 Progress: {int(progress)}% - {message}")
             except Exception as e:
                 print(f"⚠️  Failed to update status: {e}")
 
+        last_status_write = now
+
     if not is_resuming:
         print(f"\n{'='*60}")
         print(f"🔄 GA Processing Started")
         print(f"📄 PDF: {pdf_path}")
         print(f"{'='*60}\n")
 
+    # Per-page checkpoints go through a background writer thread so the
+    # serialization/fsync cost overlaps the next page's inference.
+    checkpoint_writer = _CheckpointWriter(
+        session_base, file_hash, already_written=len(results)
+    )
+
     try:
         # ===============================
         # STAGE 1: PDF → IMAGES (Skip if resuming)
@@ -298,158 +871,200 @@ def process_ga_pdf(
             # Check if images already exist
             existing_images = sorted(ga_images_dir.glob("page_*.jpg"))
             total_pages = total_pages_from_resume
-            
+
             if len(existing_images) >= start_page - 1:
                 print(f"✅ Using existing images ({len(existing_images)} pages)")
-                pages = None  # Will load individual images as needed
             else:
                 print(f"⚠️ Missing images, re-converting PDF...")
                 update_status(5, "Re-converting PDF to images...")
-                pages = convert_from_path(pdf_path, dpi=dpi)
-                total_pages = len(pages)
-                
-                # Save missing images
-                for page_index, page in enumerate(pages, start=1):
-                    image_name = f"page_{page_index}.jpg"
-                    image_path = ga_images_dir / image_name
-                    if not image_path.exists():
-                        page.save(image_path, "JPEG", quality=95)
-                
-                pages = None  # Clear from memory
+                total_pages = render_pdf_pages(
+                    pdf_path, ga_images_dir, dpi, skip_existing=True
+                )
         else:
             # Fresh start - convert PDF
             update_status(5, "Converting PDF to images...")
-            
+
             if is_cancelled_func and is_cancelled_func():
                 return results
-            
-            pages = convert_from_path(pdf_path, dpi=dpi)
-            total_pages = len(pages)
-            
+
+            total_pages = render_pdf_pages(
+                pdf_path, ga_images_dir, dpi, page_cache=page_cache
+            )
+
             if total_pages == 0:
                 update_status(0, "No pages found in PDF")
                 return results
-            
-            # Save all images
-            for page_index, page in enumerate(pages, start=1):
-                image_name = f"page_{page_index}.jpg"
-                image_path = ga_images_dir / image_name
-                page.save(image_path, "JPEG", quality=95)
-            
+
             update_status(10, f"Converted {total_pages} pages")
-            pages = None  # Clear from memory
 
         # ===============================
-        # STAGE 2: PAGE LOOP (Start from checkpoint)
+        # STAGE 2: PAGE LOOP, YOLO_BATCH PAGES PER FORWARD (from checkpoint)
         # ===============================
-        for page_index in range(start_page, total_pages + 1):
+        for batch_start in range(start_page, total_pages + 1, YOLO_BATCH):
 
             if is_cancelled_func and is_cancelled_func():
-                update_status(0, "Processing cancelled")
+                update_status(0, "Processing cancelled", status='cancelled')
                 # Save checkpoint before returning
-                save_checkpoint(session_base, file_hash, page_index - 1, total_pages, results)
+                checkpoint_writer.save(batch_start - 1, total_pages, results)
                 return results
 
-            # Load page image
-            image_name = f"page_{page_index}.jpg"
-            image_path = ga_images_dir / image_name
-            
-            if not image_path.exists():
-                print(f"⚠️ Image not found: {image_path}")
+            # Load this batch of page images
+            batch_pages = []  # (page_index, page_img, detect_img)
+            for page_index in range(
+                batch_start, min(batch_start + YOLO_BATCH, total_pages + 1)
+            ):
+                page_img = page_cache.pop(page_index, None)
+
+                if page_img is None:
+                    image_path = ga_images_dir / f"page_{page_index}.jpg"
+
+                    if not image_path.exists():
+                        print(f"⚠️ Image not found: {image_path}")
+                        continue
+
+                    page_img = cv2.imread(str(image_path))
+
+                # Detect on a downscaled copy (4x fewer pixels at 0.5)
+                if DETECT_SCALE < 1.0:
+                    detect_img = cv2.resize(
+                        page_img, None,
+                        fx=DETECT_SCALE, fy=DETECT_SCALE,
+                        interpolation=cv2.INTER_AREA,
+                    )
+                else:
+                    detect_img = page_img
+
+                batch_pages.append((page_index, page_img, detect_img))
+
+            if not batch_pages:
                 continue
-            
-            # Load image with OpenCV
-            page_img = cv2.imread(str(image_path))
-            img_h, img_w = page_img.shape[:2]
-
-            # YOLO detection
-            detections = yolo_model(page_img)[0]
-            boxes = detections.boxes
-            num_boxes = len(boxes)
-
-            # Page-level progress (10 → 50)
-            page_progress = 10 + (page_index / total_pages) * 40
-            update_status(
-                page_progress,
-                f"Page {page_index}/{total_pages}: Found {num_boxes} balloons"
-            )
 
-            # ===============================
-            # STAGE 3: BALLOON LOOP
-            # ===============================
-            page_balloons = []
-            
-            for idx, box in enumerate(boxes, start=1):
+            # One batched forward pass for the whole page batch; half
+            # precision keeps the preprocessed input tensor (and its H2D
+            # copy) at 2 bytes/px to match the FP16 engine.
+            with torch.inference_mode():
+                batch_detections = yolo_model(
+                    [d for _, _, d in batch_pages], half=USE_GPU
+                )
+
+            for (page_index, page_img, _), detections in zip(batch_pages, batch_detections):
+                img_h, img_w = page_img.shape[:2]
+                boxes = detections.boxes
+                num_boxes = len(boxes)
+
+                # Page-level progress (10 → 50)
+                page_progress = 10 + (page_index / total_pages) * 40
+                update_status(
+                    page_progress,
+                    f"Page {page_index}/{total_pages}: Found {num_boxes} balloons"
+                )
+
+                # ===============================
+                # STAGE 3: BALLOON BATCH
+                # ===============================
+                # Pull all bboxes off the GPU in one transfer, then map them
+                # back to the full-resolution page with vectorized numpy ops
+                # (instead of 4 scalar syncs + Python arithmetic per box).
+                if num_boxes:
+                    xyxy = boxes.xyxy.cpu().numpy()
+                    conf = boxes.conf.cpu().numpy()
+                    if DETECT_SCALE < 1.0:
+                        xyxy = xyxy / DETECT_SCALE
+                    xyxy = xyxy.round().astype(np.int32)
+                    np.clip(xyxy[:, 0::2], 0, img_w, out=xyxy[:, 0::2])
+                    np.clip(xyxy[:, 1::2], 0, img_h, out=xyxy[:, 1::2])
+
+                    # Gate out noise boxes before they cost an OCR call
+                    w = xyxy[:, 2] - xyxy[:, 0]
+                    h = xyxy[:, 3] - xyxy[:, 1]
+                    keep = (
+                        (conf >= MIN_BOX_CONF)
+                        & (w >= MIN_BOX_SIDE)
+                        & (h >= MIN_BOX_SIDE)
+                        & (w * h >= MIN_BOX_AREA)
+                        & (np.maximum(w, h)
+                           <= MAX_BOX_ASPECT * np.maximum(np.minimum(w, h), 1))
+                    )
+                    page_bboxes = xyxy[keep].tolist()  # plain ints for JSON
+                else:
+                    page_bboxes = []
+
+                # Crops are numpy views into the page, no copies
+                page_crops = [
+                    page_img[y1:y2, x1:x2] for x1, y1, x2, y2 in page_bboxes
+                ]
 
                 if is_cancelled_func and is_cancelled_func():
-                    update_status(0, "Processing cancelled")
+                    update_status(0, "Processing cancelled", status='cancelled')
                     # Save checkpoint before returning
-                    save_checkpoint(session_base, file_hash, page_index - 1, total_pages, results)
+                    checkpoint_writer.save(page_index - 1, total_pages, results)
                     return results
 
-                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                crop = page_img[y1:y2, x1:x2]
-
-                balloon_number = predict_number_single(
-                    crop,
-                    is_cancelled_func=is_cancelled_func
+                # Page-level OCR progress (50 → 95)
+                update_status(
+                    50 + ((page_index - 1) / total_pages) * 45,
+                    f"Page {page_index}/{total_pages}: Reading {num_boxes} balloons"
                 )
 
-                if balloon_number is None:
-                    continue
-
-                balloon_data = {
-                    "page": page_index,
-                    "balloon_number": balloon_number,
-                    "bbox": {
-                        "x1": x1,
-                        "y1": y1,
-                        "x2": x2,
-                        "y2": y2
-                    },
-                    "dpi": dpi,
-                    "image_width": img_w,
-                    "image_height": img_h
-                }
-                
-                page_balloons.append(balloon_data)
-                results.append(balloon_data)
-
-                # Balloon-level progress (50 → 95)
-                balloon_progress = (
-                    50 +
-                    ((page_index - 1) / total_pages) * 45 +
-                    (idx / num_boxes) * (45 / total_pages)
+                balloon_numbers = predict_numbers_batch(
+                    page_crops,
+                    answer_cache=answer_cache,
+                    is_cancelled_func=is_cancelled_func
                 )
 
-                update_status(
-                    balloon_progress,
-                    f"Page {page_index}/{total_pages}: Reading balloon {idx}/{num_boxes}"
-                )
-            
-            # ✅ SAVE CHECKPOINT AFTER EACH PAGE
-            save_checkpoint(session_base, file_hash, page_index, total_pages, results)
+                if len(answer_cache) > answers_persisted:
+                    tmp = answer_cache_file.with_suffix(".tmp")
+                    _json_dump(answer_cache, tmp)
+                    os.replace(tmp, answer_cache_file)
+                    answers_persisted = len(answer_cache)
+
+                for (x1, y1, x2, y2), balloon_number in zip(page_bboxes, balloon_numbers):
+                    if balloon_number is None:
+                        continue
+
+                    results.append({
+                        "page": page_index,
+                        "balloon_number": balloon_number,
+                        "bbox": {
+                            "x1": x1,
+                            "y1": y1,
+                            "x2": x2,
+                            "y2": y2
+                        },
+                        "dpi": dpi,
+                        "image_width": img_w,
+                        "image_height": img_h
+                    })
+
+                # ✅ SAVE CHECKPOINT AFTER EACH PAGE (async, latest-only)
+                checkpoint_writer.save(page_index, total_pages, results)
 
         # ===============================
         # COMPLETE
         # ===============================
         update_status(95, f"Processing complete - Found {len(results)} balloons")
         print(f"✅ GA processing finished - {len(results)} balloons detected\n")
-        
-        # ✅ Mark as complete
+
+        # ✅ Mark as complete (after the writer has flushed, so a stale
+        # in-flight checkpoint can't clear the completed flag)
+        checkpoint_writer.close()
         mark_complete(session_base, file_hash)
 
     except Exception as e:
         import traceback
         print(f"❌ Error in GA processing: {e}")
         traceback.print_exc()
-        
-        # Save checkpoint on error
+
+        # Save checkpoint on error (synchronously, once the writer is done)
+        checkpoint_writer.close()
         if 'page_index' in locals() and 'total_pages' in locals():
             save_checkpoint(session_base, file_hash, page_index - 1, total_pages, results)
-        
+
         update_status(0, f"Error: {str(e)}")
         raise
+    finally:
+        # Idempotent; flushes the last snapshot on the cancellation returns
+        checkpoint_writer.close()
 
     return results
 
@@ -489,8 +1104,7 @@ if __name__ == "__main__":
         )
 
     out_file = "test_balloon_results.json"
-    with open(out_file, "w") as f:
-        json.dump(results, f, indent=2)
+    _json_dump(results, out_file)
 
     print(f"\n💾 Results saved to: {out_file}")
     
@@ -0,0 +1,57 @@
+"""
+ga_render.py - PDFium rasterization helpers for the GA pipeline.
+
+Kept separate from ga_pipeline.py so process-pool render workers import
+only pypdfium2/cv2 and never trigger the heavy YOLO/Moondream loads that
+run at ga_pipeline import time.
+"""
+
+import cv2
+from pathlib import Path
+
+import pypdfium2 as pdfium
+
+JPEG_QUALITY = 95
+
+
+def page_count(pdf_path) -> int:
+    """Number of pages in the PDF."""
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        return len(pdf)
+    finally:
+        pdf.close()
+
+
+def render_page(pdf, page_index: int, dpi: int):
+    """Render one 1-indexed page of an open document to a BGR array."""
+    bitmap = pdf[page_index - 1].render(scale=dpi / 72)
+    page_img = bitmap.to_numpy()
+    if page_img.shape[2] == 4:
+        page_img = page_img[:, :, :3]  # drop alpha, keep BGR
+    return page_img
+
+
+def render_page_range(pdf_path, page_indices, dpi, out_dir,
+                      skip_existing=False):
+    """
+    Process-pool worker: render a chunk of pages to JPEGs with its own
+    PDFium handle (PDFium is not safe to share across processes).
+    """
+    out_dir = Path(out_dir)
+
+    pdf = pdfium.PdfDocument(str(pdf_path))
+    try:
+        for page_index in page_indices:
+            image_path = out_dir / f"page_{page_index}.jpg"
+
+            if skip_existing and image_path.exists():
+                continue
+
+            cv2.imwrite(
+                str(image_path),
+                render_page(pdf, page_index, dpi),
+                [int(cv2.IMWRITE_JPEG_QUALITY), JPEG_QUALITY],
+            )
+    finally:
+        pdf.close()
@@ -7,23 +7,92 @@ main.py - FastAPI Backend with GLOBAL GA Caching (Cross-Session)
 # ===============================
 from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from pathlib import Path
+from functools import lru_cache
+import asyncio
+import re
+import os
 import shutil
 import json
+import logging
+import logging.handlers
+import queue
+import sqlite3
 import uuid
 import multiprocessing
-from multiprocessing import Process
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import time
 import atexit
+from collections import OrderedDict
 from typing import Dict, Optional
 import threading
 import hashlib
 from datetime import datetime
 
-from bom_parser import parse_bom_pdf
 from checklist import generate_checklist
-from bom_full_parser import parse_full_bom
+from bom_full_parser import parse_all
+
+# orjson serializes the result/checklist payloads several times faster
+# than stdlib json; fall back transparently when not installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_dump_file(obj, path):
+    """Write obj as indented JSON, via orjson when available."""
+    if orjson is not None:
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=orjson.OPT_INDENT_2))
+    else:
+        with open(path, "w") as f:
+            json.dump(obj, f, indent=2)
+
+
+def _json_dump_file_atomic(obj, path):
+    """
+    Single-buffer atomic JSON write for files with concurrent readers
+    (status files): one write syscall into a temp file, then a rename,
+    so a poll can never observe a torn document.
+    """
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    if orjson is not None:
+        data = orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    else:
+        data = json.dumps(obj, indent=2).encode()
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _json_load_file(path):
+    """Read a JSON file, via orjson when available."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
+    with open(path, "r") as f:
+        return json.load(f)
+
+# ===============================
+# LOGGING
+# ===============================
+# Request handlers only enqueue records (lazy %-formatting, no stdout
+# write under the GIL); a QueueListener thread does the actual I/O.
+_log_queue = queue.SimpleQueue()
+_log_listener = logging.handlers.QueueListener(
+    _log_queue, logging.StreamHandler()
+)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+logger.setLevel(logging.INFO)
+logger.propagate = False
 
 # ===============================
 # MULTIPROCESSING SETUP
@@ -53,13 +122,129 @@ GLOBAL_CACHE_DIR.mkdir(exist_ok=True)
 # ===============================
 # FASTAPI APP
 # ===============================
-app = FastAPI()
+# orjson-rendered responses skip stdlib json for every endpoint that
+# returns a dict/list (status polls, checklists, page listings).
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse
+    app = FastAPI(default_response_class=ORJSONResponse)
+else:
+    app = FastAPI()
 
 # ===============================
 # GLOBAL SHARED STATE
 # ===============================
 processing_jobs: Dict[str, Dict[str, dict]] = {}
-processing_lock = threading.Lock()
+
+class SpinThenSleepLock:
+    """
+    Two-phase lock for the job-table critical sections, which are a
+    dict lookup or delete: retry a few non-blocking acquires (yielding
+    the GIL between tries) before paying the futex sleep of a
+    contended blocking acquire.
+    """
+    _SPINS = 20
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        acquire = self._lock.acquire
+        for _ in range(self._SPINS):
+            if acquire(False):
+                return True
+            time.sleep(0)
+        return acquire()
+
+    def release(self):
+        self._lock.release()
+
+    __enter__ = acquire
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+
+# One lock per session instead of a single global lock, so polling and
+# uploads in unrelated sessions never contend with each other.
+_session_locks: Dict[str, SpinThenSleepLock] = {}
+_session_locks_guard = threading.Lock()
+
+
+def _session_lock(session_id: str) -> SpinThenSleepLock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        with _session_locks_guard:
+            lock = _session_locks.setdefault(session_id, SpinThenSleepLock())
+    return lock
+
+
+# Terminal statuses of reaped jobs: a frontend poll that lands after
+# job-table cleanup is answered from this dict instead of falling
+# through to not_found (or a stale status file). Bounded FIFO.
+_terminal_statuses: "OrderedDict[str, dict]" = OrderedDict()
+_TERMINAL_STATUS_MAX = 256
+
+
+def _remember_terminal(job_id: str, status_data: dict):
+    _terminal_statuses[job_id] = status_data
+    while len(_terminal_statuses) > _TERMINAL_STATUS_MAX:
+        _terminal_statuses.popitem(last=False)
+
+
+# Single-flight map: hash -> pool future of the job currently
+# processing that exact PDF, so a concurrent identical upload waits
+# for the first job's cache entry instead of running a duplicate one.
+_inflight: Dict[str, object] = {}
+_inflight_guard = threading.Lock()
+
+
+def _inflight_clear(file_hash, future):
+    with _inflight_guard:
+        if _inflight.get(file_hash) is future:
+            del _inflight[file_hash]
+
+
+# Manager process backing the per-job shared status dicts. Created
+# lazily so spawned GA workers, which re-import this module, don't
+# each start one.
+_status_manager = None
+_status_manager_guard = threading.Lock()
+
+
+def _get_status_manager():
+    global _status_manager
+    if _status_manager is None:
+        with _status_manager_guard:
+            if _status_manager is None:
+                _status_manager = multiprocessing.Manager()
+    return _status_manager
+
+
+# Persistent GA worker pool. Spawning a fresh process per upload paid
+# the full ga_pipeline import (YOLO + Moondream load) every time; pool
+# workers preload it once via the initializer and are reused. One
+# worker by default — the GPU only fits one pipeline instance.
+GA_POOL_WORKERS = int(os.environ.get("GA_POOL_WORKERS", "1"))
+
+_ga_executor = None
+_ga_executor_guard = threading.Lock()
+
+
+def _preload_ga_pipeline():
+    import ga_pipeline  # noqa: F401 - warm the model load
+
+
+def _get_ga_executor():
+    global _ga_executor
+    if _ga_executor is None:
+        with _ga_executor_guard:
+            if _ga_executor is None:
+                _ga_executor = ProcessPoolExecutor(
+                    max_workers=GA_POOL_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_preload_ga_pipeline,
+                )
+    return _ga_executor
 
 # ===============================
 # CORS
@@ -85,13 +270,27 @@ def get_session_id(request: Request, required: bool = True, query_param: Optiona
     return session_id
 
 
+# Session dirs only need creating once per session lifetime, but the
+# polling endpoints hit get_session_base several times a second — cache
+# the Path after the first mkdir pass instead of re-issuing 4 syscalls.
+_session_base_cache: Dict[str, Path] = {}
+_session_base_cache_lock = threading.Lock()
+
+
 def get_session_base(session_id: str) -> Path:
-    """Get session base directory."""
+    """Get session base directory (dirs created on first use)."""
+    base = _session_base_cache.get(session_id)
+    if base is not None:
+        return base
+
     base = SESSIONS_DIR / session_id
     base.mkdir(parents=True, exist_ok=True)
     (base / "ga").mkdir(exist_ok=True)
     (base / "ga_images").mkdir(exist_ok=True)
     (base / "ga_status").mkdir(exist_ok=True)
+
+    with _session_base_cache_lock:
+        _session_base_cache[session_id] = base
     return base
 
 
@@ -102,21 +301,99 @@ def ensure_ga_dir(session_base: Path) -> Path:
     return ga_dir
 
 
-def save_ga_from_bytes(session_base: Path, filename: str, content: bytes) -> str:
-    """Save GA PDF from bytes."""
-    ga_dir = ensure_ga_dir(session_base)
-    ga_path = ga_dir / filename
-    with open(ga_path, "wb") as f:
-        f.write(content)
-    return filename
+# Plain-string session subdirs for the per-request file serving paths:
+# os.path.join on a cached string skips pathlib's object construction
+# and normalization on every image fetch.
+@lru_cache(maxsize=256)
+def _session_dir_str(session_id: str, subdir: str) -> str:
+    return str(get_session_base(session_id) / subdir)
+
+
+async def stream_upload_to(file: UploadFile, dest: Path, max_size: int) -> str:
+    """
+    Stream an UploadFile to dest in 1 MB chunks, computing the content
+    hash in the same pass. Memory per request stays bounded at one chunk
+    instead of the whole PDF, and the %PDF magic is validated from the
+    first chunk before the rest is consumed.
+    Returns the hex digest; removes dest and raises on any failure.
+    """
+    hasher = new_content_hasher()
+    size = 0
+    first_chunk = True
+
+    try:
+        with open(dest, "wb") as f:
+            while chunk := await file.read(1 << 20):
+                if first_chunk:
+                    if not chunk.startswith(b"%PDF"):
+                        raise HTTPException(400, "Invalid PDF file")
+                    first_chunk = False
+
+                size += len(chunk)
+                if size > max_size:
+                    raise HTTPException(
+                        413, f"File too large (max {max_size // 1024 // 1024}MB)"
+                    )
+
+                hasher.update(chunk)
+                f.write(chunk)
+
+        if first_chunk:  # empty upload
+            raise HTTPException(400, "Invalid PDF file")
+    except Exception:
+        dest.unlink(missing_ok=True)
+        raise
+
+    return hasher.hexdigest()
+
+# ===============================
+# RESPONSE CACHES
+# ===============================
+@lru_cache(maxsize=16)
+def _load_json_cached(path_str: str, mtime_ns: int):
+    """Parsed JSON keyed by (path, mtime), for lookups into bom_full."""
+    return _json_load_file(path_str)
+
 
 # ===============================
 # CLEAR GA DATA
 # ===============================
+# Deletes renamed-away directories off the request path; one thread is
+# plenty since the rename already made the space reusable.
+_trash_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ga-trash")
+
+
+def _page_sort_key(name: str) -> int:
+    """page_<n>.jpg -> n, so page_2 orders before page_10."""
+    try:
+        return int(name[5:-4])
+    except ValueError:
+        return 0
+
+
+def _write_page_manifest(ga_images_dir: Path):
+    """
+    Record the page image listing once, so /ga_pages reads one small
+    JSON file instead of scanning the directory on every poll.
+    """
+    names = sorted(
+        (e.name for e in os.scandir(ga_images_dir)
+         if e.name.startswith("page_") and e.name.endswith(".jpg")),
+        key=_page_sort_key,
+    )
+    _json_dump_file(names, ga_images_dir / "manifest.json")
+
+
 def clear_ga_data(session_base: Path):
     try:
-        shutil.rmtree(session_base / "ga_images", ignore_errors=True)
-        (session_base / "ga_images").mkdir(exist_ok=True)
+        # Renaming the image dir aside is one atomic syscall; the
+        # hundreds of unlinks for a large GA then happen off-path.
+        ga_images = session_base / "ga_images"
+        if ga_images.exists():
+            trash = session_base / f".trash-{uuid.uuid4().hex}"
+            os.rename(ga_images, trash)
+            _trash_executor.submit(shutil.rmtree, trash, ignore_errors=True)
+        ga_images.mkdir(exist_ok=True)
 
         ga_dir = session_base / "ga"
         if ga_dir.exists():
@@ -134,17 +411,39 @@ def clear_ga_data(session_base: Path):
 
         return True
     except Exception as e:
-        print("❌ clear_ga_data error:", e)
+        logger.exception("clear_ga_data error")
         return False
 
 # ===============================
 # GLOBAL GA CACHING FUNCTIONS (NEW)
 # ===============================
-def calculate_file_hash_from_content(content: bytes) -> str:
-    """Calculate MD5 hash from file content."""
-    hash_result = hashlib.md5(content).hexdigest()
-    print(f"🔢 Calculated hash: {hash_result}")
-    return hash_result
+# Cache keys are pinned to SHA-256: the key must be reproducible by
+# clients (the hash-only probe lets the browser compute it with
+# crypto.subtle) and stable across server environments — an
+# install-dependent hasher would orphan every existing cache row.
+# OpenSSL's SHA-NI path keeps it far faster than the upload itself.
+CONTENT_HASH_ALGO = "sha256"
+
+
+def new_content_hasher():
+    """Return a fresh incremental hasher (update()/hexdigest() API)."""
+    return hashlib.sha256()
+
+
+def _link_or_copy(src: Path, dest: Path):
+    """
+    Hardlink src to dest, falling back to a real copy when linking fails
+    (cross-device cache dir, filesystem without hardlinks). Safe here
+    because both sides only read these files once written: clear_ga_data
+    unlinks the session copies before any reprocess rewrites them, so a
+    shared inode is never truncated in place.
+    """
+    if dest.exists():
+        dest.unlink()
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
 
 
 def get_global_cache_path(file_hash: str) -> Path:
@@ -153,54 +452,143 @@ def get_global_cache_path(file_hash: str) -> Path:
     return cache_path
 
 
+# ===============================
+# GLOBAL CACHE INDEX (SQLITE)
+# ===============================
+CACHE_DB_PATH = BASE_DATA_DIR / "ga_cache.sqlite"
+
+
+def _init_cache_db():
+    """
+    Open (and migrate) the SQLite index over the global GA cache, so
+    cache checks are one indexed SELECT instead of a stat + json.load +
+    glob per request. WAL lets the worker process insert a finished GA
+    while API threads keep reading.
+    """
+    conn = sqlite3.connect(str(CACHE_DB_PATH), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        """CREATE TABLE IF NOT EXISTS cache (
+               hash TEXT PRIMARY KEY,
+               detections INTEGER,
+               pages INTEGER,
+               processed_date TEXT,
+               path TEXT
+           )"""
+    )
+
+    # One-time migration of per-hash metadata.json entries from before
+    # the index existed.
+    existing = {row[0] for row in conn.execute("SELECT hash FROM cache")}
+    for metadata_file in GLOBAL_CACHE_DIR.glob("*/metadata.json"):
+        file_hash = metadata_file.parent.name
+        if file_hash in existing:
+            continue
+        try:
+            metadata = _json_load_file(metadata_file)
+            conn.execute(
+                "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+                (
+                    file_hash,
+                    metadata.get("detections", 0),
+                    metadata.get("pages", 0),
+                    metadata.get("processed_date", ""),
+                    str(metadata_file.parent),
+                ),
+            )
+        except Exception:
+            continue
+
+    conn.commit()
+    return conn
+
+
+_cache_db = _init_cache_db()
+_cache_db_lock = threading.Lock()
+
+# In-memory read-through index over the SQLite table: the hot lookup
+# is a dict get; misses fall back to SQLite (a worker process may have
+# inserted the row) and populate the dict. Negative results are never
+# cached so a just-finished job becomes visible immediately.
+_cache_index: Dict[str, tuple] = {}
+_cache_index_lock = threading.Lock()
+
+
+def _load_cache_index():
+    with _cache_db_lock:
+        rows = _cache_db.execute(
+            "SELECT hash, detections, pages, processed_date, path FROM cache"
+        ).fetchall()
+    with _cache_index_lock:
+        for file_hash, *entry in rows:
+            _cache_index[file_hash] = tuple(entry)
+
+
+def _cache_db_upsert(file_hash: str, detections: int, pages: int,
+                     processed_date: str, path: Path):
+    with _cache_db_lock:
+        _cache_db.execute(
+            "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)",
+            (file_hash, detections, pages, processed_date, str(path)),
+        )
+        _cache_db.commit()
+    with _cache_index_lock:
+        _cache_index[file_hash] = (detections, pages, processed_date, str(path))
+
+
+def _cache_db_lookup(file_hash: str):
+    entry = _cache_index.get(file_hash)
+    if entry is not None:
+        return entry
+
+    with _cache_db_lock:
+        row = _cache_db.execute(
+            "SELECT detections, pages, processed_date, path FROM cache WHERE hash = ?",
+            (file_hash,),
+        ).fetchone()
+    if row is not None:
+        with _cache_index_lock:
+            _cache_index[file_hash] = tuple(row)
+    return row
+
+
+def _cache_db_delete(file_hash: str):
+    with _cache_index_lock:
+        _cache_index.pop(file_hash, None)
+    with _cache_db_lock:
+        _cache_db.execute("DELETE FROM cache WHERE hash = ?", (file_hash,))
+        _cache_db.commit()
+
+
 def check_global_cache(file_hash: str) -> dict:
     """
     Check if GA with this hash has been processed before (globally, across all sessions).
     """
-    cache_path = get_global_cache_path(file_hash)
-    metadata_file = cache_path / "metadata.json"
-    
-    print(f"🔍 Checking global cache: {cache_path}")
-    print(f"   Metadata file exists: {metadata_file.exists()}")
-    
-    if not metadata_file.exists():
-        print(f"ℹ️ No global cache found for hash {file_hash[:8]}...")
+    row = _cache_db_lookup(file_hash)
+
+    if row is None:
+        logger.debug("No global cache entry for hash %s", file_hash[:8])
         return {"exists": False}
-    
-    try:
-        with open(metadata_file, 'r') as f:
-            metadata = json.load(f)
-        
-        print(f"   Cache metadata loaded: {metadata}")
-        
-        # Check if required files exist
-        balloon_file = cache_path / "balloon_results.json"
-        images_dir = cache_path / "images"
-        
-        print(f"   Checking balloon file: {balloon_file} (exists: {balloon_file.exists()})")
-        print(f"   Checking images dir: {images_dir} (exists: {images_dir.exists()})")
-        
-        if balloon_file.exists() and images_dir.exists():
-            pages = len(list(images_dir.glob("page_*.jpg")))
-            print(f"   Found {pages} page images")
-            
-            if pages > 0:
-                print(f"✅ GLOBAL CACHE HIT! Hash: {file_hash[:8]}... ({pages} pages)")
-                return {
-                    "exists": True,
-                    "pages": pages,
-                    "detections": metadata.get("detections", 0),
-                    "processed_date": metadata.get("processed_date", ""),
-                    "cache_path": cache_path
-                }
-            else:
-                print(f"⚠️ Images directory exists but no images found")
-        else:
-            print(f"⚠️ Cache metadata exists but files missing")
-            
-    except Exception as e:
-        print(f"⚠️ Cache file read error: {e}")
-    
+
+    detections, pages, processed_date, path = row
+    cache_path = Path(path)
+
+    # Two cheap stats guard against entries whose artifacts were removed
+    # from disk behind the index's back.
+    if pages > 0 and (cache_path / "balloon_results.json").exists() \
+            and (cache_path / "images").exists():
+        logger.info("Global cache hit hash=%s pages=%d", file_hash[:8], pages)
+        return {
+            "exists": True,
+            "pages": pages,
+            "detections": detections,
+            "processed_date": processed_date,
+            "cache_path": cache_path
+        }
+
+    logger.warning("Cache index entry %s has missing files, dropping it", file_hash[:8])
+    _cache_db_delete(file_hash)
     return {"exists": False}
 
 
@@ -211,29 +599,36 @@ def save_to_global_cache(file_hash: str, session_base: Path, detections: int):
     cache_path = get_global_cache_path(file_hash)
     cache_path.mkdir(parents=True, exist_ok=True)
     
-    print(f"\n{'='*60}")
-    print(f"💾 SAVING TO GLOBAL CACHE")
-    print(f"   Hash: {file_hash}")
-    print(f"   Cache path: {cache_path}")
-    print(f"   Detections: {detections}")
+    logger.debug("Saving to global cache hash=%s path=%s detections=%d",
+                 file_hash, cache_path, detections)
     
     try:
-        # Copy balloon results
+        # Link balloon results
         source_balloon = session_base / "balloon_results.json"
         dest_balloon = cache_path / "balloon_results.json"
         if source_balloon.exists():
-            shutil.copy2(source_balloon, dest_balloon)
-            print(f"   ✅ Copied balloon_results.json")
-        
-        # Copy images directory
+            _link_or_copy(source_balloon, dest_balloon)
+            logger.debug("Linked balloon_results.json")
+
+        # Link images directory
         source_images = session_base / "ga_images"
         dest_images = cache_path / "images"
         if source_images.exists():
             if dest_images.exists():
                 shutil.rmtree(dest_images)
-            shutil.copytree(source_images, dest_images)
-            print(f"   ✅ Copied {len(list(dest_images.glob('*.jpg')))} images")
+            dest_images.mkdir(parents=True)
+            for img in source_images.glob("page_*.jpg"):
+                _link_or_copy(img, dest_images / img.name)
+            logger.debug("Linked images into cache")
         
+        # Keep the original PDF in the cache (hardlinked, ~free) so
+        # attach-by-hash sessions also get a viewable source document
+        ga_dir = session_base / "ga"
+        source_pdf = next(ga_dir.glob("*.pdf"), None) if ga_dir.exists() else None
+        if source_pdf is not None:
+            _link_or_copy(source_pdf, cache_path / "source.pdf")
+            logger.debug("Linked source.pdf into cache")
+
         # Save metadata
         metadata = {
             "file_hash": file_hash,
@@ -241,17 +636,21 @@ def save_to_global_cache(file_hash: str, session_base: Path, detections: int):
             "processed_date": str(datetime.now()),
             "pages": len(list(dest_images.glob("page_*.jpg"))) if dest_images.exists() else 0
         }
-        
-        with open(cache_path / "metadata.json", 'w') as f:
-            json.dump(metadata, f, indent=2)
-        
-        print(f"   ✅ Saved metadata")
-        print(f"={'='*60}\n")
-        
-    except Exception as e:
-        print(f"   ❌ Error saving to global cache: {e}")
-        import traceback
-        traceback.print_exc()
+
+        _json_dump_file(metadata, cache_path / "metadata.json")
+
+        # Register in the SQLite index (what cache checks actually read;
+        # metadata.json stays for inspection and re-migration)
+        _cache_db_upsert(
+            file_hash, detections, metadata["pages"],
+            metadata["processed_date"], cache_path
+        )
+
+        logger.info("Saved global cache entry hash=%s pages=%d detections=%d",
+                    file_hash[:8], metadata["pages"], detections)
+
+    except Exception:
+        logger.exception("Error saving to global cache")
 
 
 def copy_from_global_cache(file_hash: str, session_base: Path) -> bool:
@@ -260,20 +659,17 @@ def copy_from_global_cache(file_hash: str, session_base: Path) -> bool:
     """
     cache_path = get_global_cache_path(file_hash)
     
-    print(f"\n{'='*60}")
-    print(f"📋 COPYING FROM GLOBAL CACHE")
-    print(f"   Source: {cache_path}")
-    print(f"   Destination: {session_base}")
+    logger.debug("Copying from global cache %s -> %s", cache_path, session_base)
     
     try:
         # Copy balloon results
         source_balloon = cache_path / "balloon_results.json"
         dest_balloon = session_base / "balloon_results.json"
         if source_balloon.exists():
-            shutil.copy2(source_balloon, dest_balloon)
-            print(f"   ✅ Copied balloon_results.json")
+            _link_or_copy(source_balloon, dest_balloon)
+            logger.debug("Linked balloon_results.json")
         else:
-            print(f"   ❌ Source balloon_results.json not found")
+            logger.warning("Cached balloon_results.json not found at %s", source_balloon)
             return False
         
         # Copy images
@@ -284,24 +680,38 @@ def copy_from_global_cache(file_hash: str, session_base: Path) -> bool:
             if dest_images.exists():
                 shutil.rmtree(dest_images)
             dest_images.mkdir(parents=True, exist_ok=True)
-            
-            # Copy all images
-            for img in source_images.glob("page_*.jpg"):
-                shutil.copy2(img, dest_images / img.name)
-            
+
+            # Link all images; fan the per-file syscalls out across
+            # threads so a cross-device copy2 fallback overlaps its I/O
+            images = list(source_images.glob("page_*.jpg"))
+            if images:
+                with ThreadPoolExecutor(
+                    max_workers=min(32, (os.cpu_count() or 1) * 4)
+                ) as pool:
+                    list(pool.map(
+                        lambda img: _link_or_copy(img, dest_images / img.name),
+                        images,
+                    ))
+
             copied_count = len(list(dest_images.glob("page_*.jpg")))
-            print(f"   ✅ Copied {copied_count} images")
+            _write_page_manifest(dest_images)
+            logger.info("Linked %d cached images into session", copied_count)
         else:
-            print(f"   ❌ Source images directory not found")
+            logger.warning("Cached images directory not found at %s", source_images)
             return False
         
-        print(f"{'='*60}\n")
+        # Hand the session the original PDF when the cache carries one
+        # (sessions attached by hash never uploaded it)
+        source_pdf = cache_path / "source.pdf"
+        dest_pdf = ensure_ga_dir(session_base) / "source.pdf"
+        if source_pdf.exists() and not dest_pdf.exists():
+            _link_or_copy(source_pdf, dest_pdf)
+            logger.debug("Linked source.pdf into session")
+
         return True
-        
-    except Exception as e:
-        print(f"   ❌ Error copying from global cache: {e}")
-        import traceback
-        traceback.print_exc()
+
+    except Exception:
+        logger.exception("Error copying from global cache")
         return False
 
 # ===============================
@@ -309,6 +719,7 @@ def copy_from_global_cache(file_hash: str, session_base: Path) -> bool:
 # ===============================
 @app.on_event("startup")
 async def startup_event():
+    _load_cache_index()
     print("✅ FastAPI server initialized with GLOBAL GA caching")
     print(f"📁 Global cache directory: {GLOBAL_CACHE_DIR}")
 
@@ -316,12 +727,18 @@ async def startup_event():
 @app.on_event("shutdown")
 def shutdown_event():
     print("🛑 Shutdown started")
-    with processing_lock:
-        for session_id in list(processing_jobs.keys()):
-            for job in processing_jobs[session_id].values():
-                p = job.get("process")
-                if p and p.is_alive():
-                    p.kill()
+    # Snapshot without locking: shutdown only needs best-effort cancels
+    for session_id in list(processing_jobs.keys()):
+        with _session_lock(session_id):
+            for job in list(processing_jobs.get(session_id, {}).values()):
+                event = job.get("cancel_event")
+                if event is not None:
+                    try:
+                        event.set()
+                    except Exception:
+                        pass
+    if _ga_executor is not None:
+        _ga_executor.shutdown(wait=False, cancel_futures=True)
     print("✅ Shutdown complete")
 
 
@@ -332,13 +749,13 @@ atexit.register(shutdown_event)
 # ===============================
 @app.get("/")
 def health():
-    with processing_lock:
-        total_jobs = sum(len(v) for v in processing_jobs.values())
-        
-        # Count cached GAs
-        cache_count = len(list(GLOBAL_CACHE_DIR.glob("*")))
-        
-        return {
+    total_jobs = sum(len(v) for v in list(processing_jobs.values()))
+
+    # Count cached GAs from the index, not an O(N) directory scan
+    with _cache_db_lock:
+        cache_count = _cache_db.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+    return {
             "status": "Panel Inspection Backend Running",
             "active_jobs": total_jobs,
             "sessions": list(processing_jobs.keys()),
@@ -356,17 +773,8 @@ async def upload_bom(request: Request, file: UploadFile = File(...)):
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files allowed")
 
-    content = await file.read()
-
-    if len(content) > 10 * 1024 * 1024:
-        raise HTTPException(status_code=400, detail="File too large (max 10MB)")
-
-    if not content.startswith(b"%PDF"):
-        raise HTTPException(status_code=400, detail="Invalid PDF file")
-
     bom_path = session_base / file.filename
-    with open(bom_path, "wb") as f:
-        f.write(content)
+    await stream_upload_to(file, bom_path, 10 * 1024 * 1024)
 
     return {
         "message": "BOM uploaded successfully",
@@ -375,8 +783,13 @@ async def upload_bom(request: Request, file: UploadFile = File(...)):
     }
 
 
+def _write_json(path: Path, obj):
+    """Blocking JSON write, meant to run inside the threadpool."""
+    _json_dump_file(obj, path)
+
+
 @app.post("/process/bom")
-def process_bom(request: Request, filename: str):
+async def process_bom(request: Request, filename: str):
     session_id = get_session_id(request)
     session_base = get_session_base(session_id)
 
@@ -385,15 +798,13 @@ def process_bom(request: Request, filename: str):
         raise HTTPException(status_code=404, detail=f"BOM file '{filename}' not found")
 
     try:
-        bom_items = parse_bom_pdf(bom_path)
+        # Single pass over the PDF fills both the checklist and full BOM;
+        # the parse is CPU-heavy, so keep it off the event loop
+        bom_items, full_bom = await run_in_threadpool(parse_all, bom_path)
         checklist = generate_checklist(bom_items)
 
-        with open(session_base / "checklist.json", "w") as f:
-            json.dump(checklist, f, indent=2)
-
-        full_bom = parse_full_bom(bom_path)
-        with open(session_base / "bom_full.json", "w") as f:
-            json.dump(full_bom, f, indent=2)
+        await run_in_threadpool(_write_json, session_base / "checklist.json", checklist)
+        await run_in_threadpool(_write_json, session_base / "bom_full.json", full_bom)
 
         return checklist
 
@@ -411,8 +822,7 @@ def get_bom_details(request: Request, find_number: str):
         return {}
 
     try:
-        with open(bom_file, "r") as f:
-            full_bom = json.load(f)
+        full_bom = _load_json_cached(str(bom_file), bom_file.stat().st_mtime_ns)
         return full_bom.get(str(find_number).strip(), {})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading BOM details: {str(e)}")
@@ -425,92 +835,106 @@ def process_ga_worker(
     session_base: Path,
     status_file: Path,
     results_file: Path,
-    file_hash: str = None
+    file_hash: str = None,
+    status_proxy=None,
+    cancel_event=None
 ):
-    """Runs GA processing in a separate OS process."""
+    """Runs GA processing in a pool worker process."""
     try:
         from ga_pipeline import process_ga_pdf
 
-        print(f"🚀 GA worker started | status_file={status_file}")
-        print(f"   File hash: {file_hash}")
+        logger.info("GA worker started status_file=%s hash=%s",
+                    status_file, file_hash)
 
-        cancelled_flag = [False]
-        
         def is_cancelled():
-            return cancelled_flag[0]
+            return cancel_event is not None and cancel_event.is_set()
+
+        def publish_status(data):
+            """Mirror progress into the shared dict the API reads from."""
+            if status_proxy is not None:
+                try:
+                    status_proxy.update(data)
+                except Exception:
+                    pass
 
         results = process_ga_pdf(
             pdf_path=pdf_path,
             dpi=300,
             status_file=status_file,
-            is_cancelled_func=is_cancelled
+            is_cancelled_func=is_cancelled,
+            on_status=publish_status
         )
 
+        # Gate on the event itself, not just the status file: a late
+        # progress write must never let a cancelled job fall through to
+        # the completion path and poison the global cache with partial
+        # results.
+        if is_cancelled():
+            logger.info("GA cancelled")
+            return
+
         if status_file.exists():
             try:
-                with open(status_file, 'r') as f:
-                    status_data = json.load(f)
-                    if status_data.get('status') == 'cancelled':
-                        print(f"⛔ GA cancelled")
-                        return
+                status_data = _json_load_file(status_file)
+                if status_data.get('status') == 'cancelled':
+                    logger.info("GA cancelled")
+                    return
             except:
                 pass
 
+        # process_ga_pdf writes every page image before returning, so a
+        # single check replaces the old 0.5 s glob-polling loop.
         ga_images_dir = session_base / "ga_images"
-        start_time = time.time()
+        if not any(ga_images_dir.glob("page_*.jpg")):
+            raise RuntimeError("GA pipeline returned without writing page images")
 
-        while True:
-            images = list(ga_images_dir.glob("page_*.jpg"))
-            if images:
-                break
-            if time.time() - start_time > 30:
-                raise RuntimeError("GA images not generated within timeout")
-            time.sleep(0.5)
+        _write_page_manifest(ga_images_dir)
 
-        with open(results_file, "w") as f:
-            json.dump(results, f, indent=2)
+        _json_dump_file(results, results_file)
 
         detections = len(results) if isinstance(results, list) else 0
 
-        with open(status_file, 'w') as f:
-            json.dump({
-                "status": "complete",
-                "progress": 100,
-                "message": f"Found {detections} balloons",
-                "detections": detections
-            }, f)
+        final_status = {
+            "status": "complete",
+            "progress": 100,
+            "message": f"Found {detections} balloons",
+            "detections": detections
+        }
+        publish_status(final_status)
+        _json_dump_file_atomic(final_status, status_file)
 
-        print(f"✅ GA completed | detections={detections}")
+        logger.info("GA completed detections=%d", detections)
 
         # 🔥🔥🔥 SAVE TO GLOBAL CACHE IMMEDIATELY 🔥🔥🔥
         if file_hash:
-            print(f"\n{'='*60}")
-            print(f"🔥 WORKER: SAVING TO GLOBAL CACHE")
-            print(f"   Hash: {file_hash}")
-            print(f"   Detections: {detections}")
-            print(f"={'='*60}")
-            
+            logger.debug("Worker saving to global cache hash=%s detections=%d",
+                         file_hash, detections)
+
             try:
                 save_to_global_cache(file_hash, session_base, detections)
-                print(f"✅ WORKER: Global cache saved successfully!")
             except Exception as cache_error:
-                print(f"❌ WORKER: Error saving to global cache: {cache_error}")
+                logger.exception("Worker error saving to global cache")
                 import traceback
                 traceback.print_exc()
         else:
-            print(f"⚠️ WORKER: No file_hash provided, cannot save to global cache")
+            logger.warning("No file_hash provided, cannot save to global cache")
 
     except Exception as e:
         import traceback
         traceback.print_exc()
 
-        with open(status_file, 'w') as f:
-            json.dump({
-                "status": "error",
-                "progress": 0,
-                "message": str(e),
-                "error": str(e)
-            }, f)
+        error_status = {
+            "status": "error",
+            "progress": 0,
+            "message": str(e),
+            "error": str(e)
+        }
+        if status_proxy is not None:
+            try:
+                status_proxy.update(error_status)
+            except Exception:
+                pass
+        _json_dump_file_atomic(error_status, status_file)
 
 # ===============================
 # GA UPLOAD WITH GLOBAL CACHING
@@ -520,50 +944,50 @@ async def upload_ga(request: Request, file: UploadFile = File(...), force: Optio
     session_id = get_session_id(request, required=True)
     session_base = get_session_base(session_id)
     
-    print(f"\n{'='*60}")
-    print(f"📤 GA UPLOAD REQUEST")
-    print(f"   Session: {session_id[:8]}...")
-    print(f"   File: {file.filename}")
-    print(f"   Force: {force}")
-    print(f"{'='*60}\n")
+    logger.debug("GA upload request session=%s file=%s force=%s",
+                 session_id[:8], file.filename, force)
     
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(400, "File must be PDF")
-    
-    content = await file.read()
-    if len(content) > MAX_GA_SIZE:
-        raise HTTPException(400, f"GA too large (max {MAX_GA_SIZE//1024//1024}MB)")
-    
-    if not content.startswith(b'%PDF'):
-        raise HTTPException(400, "Invalid PDF file")
-    
-    # Calculate file hash
-    file_hash = calculate_file_hash_from_content(content)
-    print(f"🔍 File hash: {file_hash}")
+
+    # Stream to a session-local temp file, hashing in the same pass; the
+    # temp file is renamed into place once the cache decision is made.
+    upload_tmp = session_base / f".upload_{uuid.uuid4().hex}.pdf"
+    file_hash = await stream_upload_to(file, upload_tmp, MAX_GA_SIZE)
+    logger.debug("File hash: %s", file_hash)
     
     # ✅ Check GLOBAL cache (skip if force=true)
     if force != "true":
-        print(f"🔍 Checking global cache...")
-        cached = check_global_cache(file_hash)
-        
+        cached = await run_in_threadpool(check_global_cache, file_hash)
+
+        if not cached["exists"]:
+            # Single-flight: another session may be processing this
+            # exact PDF right now; wait for its cache entry instead of
+            # running a duplicate 30-second job.
+            with _inflight_guard:
+                inflight = _inflight.get(file_hash)
+            if inflight is not None:
+                logger.info("Identical GA already processing, waiting (hash=%s)",
+                            file_hash[:8])
+                try:
+                    await asyncio.wrap_future(inflight)
+                except Exception:
+                    pass
+                cached = await run_in_threadpool(check_global_cache, file_hash)
+
         if cached["exists"]:
-            print(f"\n{'='*60}")
-            print(f"✅ GLOBAL CACHE HIT - Using cached results!")
-            print(f"   Pages: {cached['pages']}")
-            print(f"   Detections: {cached['detections']}")
-            print(f"   Processed: {cached['processed_date']}")
-            print(f"={'='*60}\n")
+            logger.info("Using cached GA results pages=%s detections=%s processed=%s",
+                        cached["pages"], cached["detections"], cached["processed_date"])
             
-            # Copy cached results to current session
-            success = copy_from_global_cache(file_hash, session_base)
+            # Copy cached results to current session (off the event loop)
+            success = await run_in_threadpool(copy_from_global_cache, file_hash, session_base)
             
             if success:
-                # Save the PDF file for reference
-                ga_dir = ensure_ga_dir(session_base)
-                ga_path = ga_dir / file.filename
-                with open(ga_path, "wb") as f:
-                    f.write(content)
-                
+                # Keep the PDF file for reference; the streamed temp
+                # already holds the verified bytes, and the rename is
+                # one syscall either way
+                os.replace(upload_tmp, ensure_ga_dir(session_base) / file.filename)
+
                 return {
                     "status": "cached",
                     "message": "GA already processed globally, using cached results",
@@ -573,88 +997,104 @@ async def upload_ga(request: Request, file: UploadFile = File(...), force: Optio
                     "file_hash": file_hash
                 }
             else:
-                print(f"⚠️ Failed to copy from cache, will reprocess")
+                logger.warning("Failed to copy from cache, will reprocess")
         else:
-            print(f"ℹ️ No global cache found - will process from scratch")
+            logger.debug("No global cache found - will process from scratch")
     else:
-        print(f"🔄 Force reprocess requested, bypassing cache")
-    
+        logger.debug("Force reprocess requested, bypassing cache")
+
     # Not cached or force reprocess - proceed with normal processing
-    print(f"⚙️ Starting GA processing...")
     
-    # Kill any existing GA job for this session
-    with processing_lock:
+    # Cancel any existing GA job for this session
+    with _session_lock(session_id):
         if session_id in processing_jobs:
             for job_id, job_data in list(processing_jobs[session_id].items()):
-                proc = job_data["process"]
-                if proc.is_alive():
-                    print(f"⛔ Killing old GA job: {job_id}")
-                    proc.terminate()
-                    proc.join(timeout=3)
-                    if proc.is_alive():
-                        proc.kill()
+                logger.info("Cancelling old GA job: %s", job_id)
+                event = job_data.get("cancel_event")
+                if event is not None:
+                    try:
+                        event.set()
+                    except Exception:
+                        pass
+                future = job_data.get("future")
+                if future is not None:
+                    future.cancel()
                 del processing_jobs[session_id][job_id]
     
     # Clear session GA data
-    clear_ga_data(session_base)
-    
-    # Save uploaded PDF
-    ga_path = save_ga_from_bytes(session_base, file.filename, content)
-    ga_full_path = session_base / "ga" / ga_path
+    await run_in_threadpool(clear_ga_data, session_base)
+
+    # Move the uploaded PDF into place
+    ga_full_path = ensure_ga_dir(session_base) / file.filename
+    os.replace(upload_tmp, ga_full_path)
     
     # Generate job ID
     job_id = str(uuid.uuid4())
-    print(f"🚀 GA started | session={session_id[:8]}... job={job_id[:8]}... file={file.filename}")
+    logger.info("GA started session=%s job=%s file=%s",
+                session_id[:8], job_id[:8], file.filename)
     
     # Create status file
     status_dir = session_base / "ga_status"
     status_dir.mkdir(parents=True, exist_ok=True)
     status_file = status_dir / f"{job_id}.json"
     
-    with open(status_file, 'w') as f:
-        json.dump({
-            "status": "queued",
-            "progress": 0,
-            "message": "Starting GA processing...",
-            "file_hash": file_hash
-        }, f)
-    
+    initial_status = {
+        "status": "queued",
+        "progress": 0,
+        "message": "Starting GA processing...",
+        "file_hash": file_hash
+    }
+
+    await run_in_threadpool(_json_dump_file_atomic, initial_status, status_file)
+
+    # Shared status dict: the worker updates it in memory, so polling
+    # doesn't have to re-read the status file (kept for crash recovery)
+    status_proxy = _get_status_manager().dict(initial_status)
+
+    # Cooperative cancellation: the pool worker polls this event, so
+    # cancelling doesn't require killing (and cold-restarting) a worker
+    cancel_event = _get_status_manager().Event()
+
     results_file = session_base / "balloon_results.json"
-    
-    # Spawn worker process
-    process = Process(
-        target=process_ga_worker,
-        args=(
-            str(ga_full_path),
-            session_base,
-            status_file,
-            results_file,
-            file_hash  # ✅ Pass file_hash to worker
-        )
+
+    # Submit to the persistent worker pool
+    future = _get_ga_executor().submit(
+        process_ga_worker,
+        str(ga_full_path),
+        session_base,
+        status_file,
+        results_file,
+        file_hash,  # ✅ Pass file_hash to worker
+        status_proxy,
+        cancel_event
     )
-    process.start()
-    
+
+    # Register as the in-flight job for this hash; cleared when the
+    # worker finishes (the cache entry exists by then)
+    with _inflight_guard:
+        _inflight[file_hash] = future
+    future.add_done_callback(lambda f: _inflight_clear(file_hash, f))
+
     # Track job
-    with processing_lock:
+    with _session_lock(session_id):
         if session_id not in processing_jobs:
             processing_jobs[session_id] = {}
-        
+
         processing_jobs[session_id][job_id] = {
-            "process": process,
+            "future": future,
+            "cancel_event": cancel_event,
             "start_time": time.time(),
             "filename": file.filename,
             "file_hash": file_hash,
             "status_file": status_file,
+            "status": status_proxy,
             "results_file": results_file,
             "session_base": session_base  # ✅ Make sure this is set!
         }
-        
-        print(f"📝 Job tracking info:")
-        print(f"   Job ID: {job_id[:8]}...")
-        print(f"   File hash: {file_hash}")
-        print(f"   Session base: {session_base}")
-        print(f"   Results file: {results_file}")
-    
+
+        logger.debug("Tracking job %s hash=%s results=%s",
+                     job_id[:8], file_hash, results_file)
+
     return {
         "job_id": job_id,
         "session_id": session_id,
@@ -669,19 +1109,18 @@ async def check_ga_cache_endpoint(request: Request, file: UploadFile = File(...)
     """Check if GA file has been processed before (globally)."""
     session_id = get_session_id(request, required=True)
     
-    content = await file.read()
-    file_hash = calculate_file_hash_from_content(content)
-    
-    print(f"\n{'='*60}")
-    print(f"🔍 GLOBAL CACHE CHECK REQUEST")
-    print(f"   Session: {session_id[:8]}...")
-    print(f"   File hash: {file_hash}")
-    print(f"={'='*60}")
-    
-    cached = check_global_cache(file_hash)
-    
+    # Hash the upload chunk-by-chunk: peak memory stays at one chunk
+    # and hashing overlaps the transfer instead of waiting for it.
+    hasher = new_content_hasher()
+    while chunk := await file.read(1 << 16):
+        hasher.update(chunk)
+    file_hash = hasher.hexdigest()
+
+    logger.debug("Cache check request session=%s hash=%s", session_id[:8], file_hash)
+
+    cached = await run_in_threadpool(check_global_cache, file_hash)
+
     if cached["exists"]:
-        print(f"✅ Global cache exists!")
         return {
             "cached": True,
             "pages": cached["pages"],
@@ -690,12 +1129,59 @@ async def check_ga_cache_endpoint(request: Request, file: UploadFile = File(...)
             "message": "This GA has been processed before. Results will load instantly."
         }
     
-    print(f"ℹ️ No global cache found")
     return {
         "cached": False,
         "message": "New GA file. Processing will take 1-3 minutes."
     }
 
+# ===============================
+# HASH-ONLY CACHE PROBE / ATTACH
+# ===============================
+@app.head("/cache/ga/{file_hash}")
+def head_ga_cache(file_hash: str):
+    """
+    Hash-only cache probe: clients hash the PDF locally (same pinned
+    algorithm, advertised in X-Cache-Hash-Algo on every response) and
+    call this before uploading, skipping the transfer on a cache hit.
+    """
+    cached = check_global_cache(file_hash)
+    if not cached["exists"]:
+        return Response(
+            status_code=404,
+            headers={"X-Cache-Hash-Algo": CONTENT_HASH_ALGO},
+        )
+
+    return Response(headers={
+        "X-Cache-Hash-Algo": CONTENT_HASH_ALGO,
+        "X-Cache-Pages": str(cached["pages"]),
+        "X-Cache-Detections": str(cached["detections"]),
+    })
+
+
+@app.post("/attach/ga/{file_hash}")
+async def attach_ga_cache(request: Request, file_hash: str):
+    """Attach cached GA results to this session without an upload body."""
+    session_id = get_session_id(request)
+    session_base = get_session_base(session_id)
+
+    cached = await run_in_threadpool(check_global_cache, file_hash)
+    if not cached["exists"]:
+        raise HTTPException(status_code=404, detail="Not cached")
+
+    success = await run_in_threadpool(copy_from_global_cache, file_hash, session_base)
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to attach cached GA")
+
+    return {
+        "status": "cached",
+        "message": "GA already processed globally, using cached results",
+        "session_id": session_id,
+        "pages": cached["pages"],
+        "detections": cached["detections"],
+        "file_hash": file_hash
+    }
+
+
 # ===============================
 # JOB STATUS
 # ===============================
@@ -703,83 +1189,90 @@ async def check_ga_cache_endpoint(request: Request, file: UploadFile = File(...)
 def get_job_status(request: Request, job_id: str):
     session_id = get_session_id(request, required=True)
     
-    with processing_lock:
+    with _session_lock(session_id):
         if session_id not in processing_jobs or job_id not in processing_jobs[session_id]:
-            return {"status": "not_found"}
-        
+            # Reaped jobs answer late polls from the terminal cache —
+            # a dict get, no file I/O
+            return _terminal_statuses.get(job_id, {"status": "not_found"})
+
         job = processing_jobs[session_id][job_id]
-        process = job["process"]
+        future = job["future"]
         status_file = job["status_file"]
+        status_proxy = job.get("status")
         results_file = job["results_file"]
         file_hash = job.get("file_hash")
         session_base = job.get("session_base")
-    
-    # ✅ Check if process is still running
-    if process.is_alive():
+
+    def read_status():
+        """Prefer the shared in-memory dict; fall back to the file."""
+        if status_proxy is not None:
+            try:
+                data = dict(status_proxy)
+                if data.get("status"):
+                    return data
+            except Exception:
+                pass
+        # mtime-keyed cache: unchanged files cost one stat(), not an
+        # open+read+parse, on every poll
+        return dict(_load_json_cached(
+            str(status_file), os.stat(status_file).st_mtime_ns
+        ))
+
+    # ✅ Check if the job is still running
+    if not future.done():
         try:
-            with open(status_file, 'r') as f:
-                status_data = json.load(f)
-            return status_data
+            return read_status()
         except Exception as e:
             return {
                 "status": "error",
                 "message": f"Failed to read status: {str(e)}"
             }
-    
-    # ✅ Process has finished - handle completion
+
+    # ✅ Job has finished - handle completion
     try:
-        with open(status_file, 'r') as f:
-            status_data = json.load(f)
-        
-        print(f"\n{'='*60}")
-        print(f"📊 JOB STATUS CHECK")
-        print(f"   Job ID: {job_id[:8]}...")
-        print(f"   Status: {status_data.get('status')}")
-        print(f"   File hash: {file_hash}")
-        print(f"   Results file exists: {results_file.exists()}")
-        print(f"={'='*60}\n")
-        
+        status_data = read_status()
+
+        logger.debug("Job %s finished with status=%s hash=%s",
+                     job_id[:8], status_data.get("status"), file_hash)
+
         if status_data["status"] == "complete":
             # ✅ ✅ ✅ SAVE TO GLOBAL CACHE ✅ ✅ ✅
             if file_hash and session_base and results_file.exists():
                 try:
                     # Count detections
-                    with open(results_file, 'r') as f:
-                        results = json.load(f)
+                    results = _json_load_file(results_file)
                     detections = len(results) if isinstance(results, list) else 0
                     
                     # 🔥 SAVE TO GLOBAL CACHE 🔥
-                    print(f"🔥 ATTEMPTING TO SAVE TO GLOBAL CACHE")
                     save_to_global_cache(file_hash, session_base, detections)
-                    print(f"✅ Global cache save completed successfully!")
-                    
-                except Exception as cache_error:
-                    print(f"❌ Error saving to global cache: {cache_error}")
-                    import traceback
-                    traceback.print_exc()
+
+                except Exception:
+                    logger.exception("Error saving to global cache")
             else:
-                print(f"⚠️ Cannot save cache:")
-                print(f"   file_hash: {file_hash}")
-                print(f"   session_base: {session_base}")
-                print(f"   results_file exists: {results_file.exists()}")
+                logger.warning(
+                    "Cannot save cache: hash=%s base=%s results_exist=%s",
+                    file_hash, session_base, results_file.exists())
             
             # Cleanup job tracking
-            with processing_lock:
+            with _session_lock(session_id):
                 if session_id in processing_jobs and job_id in processing_jobs[session_id]:
+                    _remember_terminal(job_id, status_data)
                     del processing_jobs[session_id][job_id]
-                    print(f"✅ Cleaned up job tracking for {job_id[:8]}...")
+                    logger.debug("Cleaned up job tracking for %s", job_id[:8])
             
             return status_data
         
         elif status_data["status"] == "cancelled":
-            with processing_lock:
+            with _session_lock(session_id):
                 if session_id in processing_jobs and job_id in processing_jobs[session_id]:
+                    _remember_terminal(job_id, status_data)
                     del processing_jobs[session_id][job_id]
             return status_data
-        
+
         elif status_data["status"] == "error":
-            with processing_lock:
+            with _session_lock(session_id):
                 if session_id in processing_jobs and job_id in processing_jobs[session_id]:
+                    _remember_terminal(job_id, status_data)
                     del processing_jobs[session_id][job_id]
             return status_data
         
@@ -787,14 +1280,68 @@ def get_job_status(request: Request, job_id: str):
             return status_data
         
     except Exception as e:
-        print(f"❌ Error in job status: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error in job status")
         return {
             "status": "error",
             "message": f"Process died: {str(e)}"
         }
 
+# ===============================
+# JOB STATUS EVENTS (SSE)
+# ===============================
+@app.get("/job/events/{job_id}")
+async def job_status_events(
+    request: Request,
+    job_id: str,
+    session_id: Optional[str] = Query(None)
+):
+    """
+    Server-sent status stream: pushes an event only when the status
+    actually changes, so clients using EventSource skip the 1-2s
+    polling loop (and its mostly-unchanged responses) entirely.
+    """
+    sess_id = get_session_id(request, required=True, query_param=session_id)
+
+    with _session_lock(sess_id):
+        job = processing_jobs.get(sess_id, {}).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    status_proxy = job.get("status")
+    status_file = job["status_file"]
+    future = job["future"]
+
+    async def event_stream():
+        last_sent = None
+        while True:
+            try:
+                if status_proxy is not None:
+                    # Manager round-trip, so keep it off the event loop
+                    data = await run_in_threadpool(dict, status_proxy)
+                else:
+                    data = await run_in_threadpool(_json_load_file, status_file)
+            except Exception:
+                data = {}
+
+            if data and data != last_sent:
+                last_sent = data
+                if orjson is not None:
+                    body = orjson.dumps(data).decode()
+                else:
+                    body = json.dumps(data)
+                yield f"data: {body}\n\n"
+
+            if data.get("status") in ("complete", "cancelled", "error") \
+                    or future.done():
+                break
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
 # ===============================
 # JOB CANCEL
 # ===============================
@@ -802,31 +1349,44 @@ def get_job_status(request: Request, job_id: str):
 def cancel_job(request: Request, job_id: str):
     session_id = get_session_id(request)
 
-    with processing_lock:
+    with _session_lock(session_id):
         job = processing_jobs.get(session_id, {}).get(job_id)
         if not job:
             return {"status": "not_found"}
 
-        process = job["process"]
+        future = job["future"]
+        cancel_event = job.get("cancel_event")
         status_file = job.get("status_file")
+        status_proxy = job.get("status")
+
+        cancelled_status = {
+            "status": "cancelled",
+            "progress": 0,
+            "message": "Cancelled by user"
+        }
+
+        if status_proxy is not None:
+            try:
+                status_proxy.update(cancelled_status)
+            except Exception:
+                pass
 
         if status_file:
             try:
-                with open(status_file, 'w') as f:
-                    json.dump({
-                        "status": "cancelled",
-                        "progress": 0,
-                        "message": "Cancelled by user"
-                    }, f)
+                _json_dump_file_atomic(cancelled_status, status_file)
             except:
                 pass
 
-        if process.is_alive():
-            process.terminate()
-            process.join(timeout=3)
-            if process.is_alive():
-                process.kill()
+        # Cooperative cancel: queued jobs are dropped outright, running
+        # ones see the event at their next page boundary
+        if cancel_event is not None:
+            try:
+                cancel_event.set()
+            except Exception:
+                pass
+        future.cancel()
 
+        _remember_terminal(job_id, cancelled_status)
         del processing_jobs[session_id][job_id]
 
         return {"status": "cancelled"}
@@ -847,17 +1407,16 @@ def get_balloon_results(request: Request):
         f = session_base / "balloon_results.json"
         
         if not f.exists():
-            return []
-        
-        with open(f, 'r') as file:
-            results = json.load(file)
-            print(f"   ✅ Loaded {len(results)} balloon results")
-            return results
-            
+            return _EMPTY_RESULTS_RESP
+
+        # Stream the file as-is (sendfile on Linux) — the wire format
+        # is the file's own bytes, so no parse or re-encode happens.
+        return FileResponse(f, media_type="application/json")
+
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error reading balloon results: {e}")
+        logger.exception("Error reading balloon results")
         return []
 
 
@@ -865,18 +1424,69 @@ def get_balloon_results(request: Request):
 def get_ga_pages(request: Request):
     try:
         session_id = get_session_id(request)
-        session_base = get_session_base(session_id)
-        images = sorted((session_base / "ga_images").glob("page_*.jpg"))
-        
+        ga_images_dir = _session_dir_str(session_id, "ga_images")
+
+        # The worker (or cache copy) leaves a manifest behind; reading
+        # it beats re-scanning a 500-entry directory on every poll.
+        manifest = os.path.join(ga_images_dir, "manifest.json")
+        try:
+            names = _load_json_cached(manifest, os.stat(manifest).st_mtime_ns)
+        except OSError:
+            names = _list_ga_pages(ga_images_dir)
+
+        if not names:
+            return _EMPTY_PAGES_RESP
+
         return {
-            "pages": len(images),
-            "images": [p.name for p in images]
+            "pages": len(names),
+            "images": names
         }
     except Exception as e:
-        print(f"❌ Error getting GA pages: {e}")
+        logger.exception("Error getting GA pages")
         raise HTTPException(status_code=500, detail=f"Error getting GA pages: {str(e)}")
 
 
+# Prebuilt responses for the empty cases the frontend polls into
+# before a job finishes: returned by reference, so a miss allocates no
+# list, response object, or serialization work. Safe to share —
+# starlette responses are immutable once built.
+_EMPTY_RESULTS_RESP = Response(content=b"[]", media_type="application/json")
+_EMPTY_PAGES_RESP = Response(
+    content=b'{"pages": 0, "images": []}', media_type="application/json"
+)
+
+
+# Single-pass checks for client-supplied filenames: one DFA scan
+# replaces basename() plus separate substring searches, and rejects
+# traversal outright since no separator can match. The PDF pattern
+# must admit every name the upload path accepts (any characters, a
+# case-insensitive .pdf extension), so it only excludes separators
+# and NUL rather than allowlisting characters.
+_SAFE_IMAGE_NAME = re.compile(r"page_\d+\.jpg").fullmatch
+_SAFE_PDF_NAME = re.compile(r"[^/\\\x00]+\.pdf", re.IGNORECASE).fullmatch
+
+
+# Manifest-less fallback listing, keyed by directory mtime: an
+# unchanged directory costs one stat instead of a full scan, and
+# os.scandir avoids pathlib allocation + fnmatch per entry.
+_page_list_cache: Dict[str, tuple] = {}
+
+
+def _list_ga_pages(dir_str: str):
+    mtime_ns = os.stat(dir_str).st_mtime_ns
+    cached = _page_list_cache.get(dir_str)
+    if cached is not None and cached[0] == mtime_ns:
+        return cached[1]
+
+    names = sorted(
+        (e.name for e in os.scandir(dir_str)
+         if e.name.startswith("page_") and e.name.endswith(".jpg")),
+        key=_page_sort_key,
+    )
+    _page_list_cache[dir_str] = (mtime_ns, names)
+    return names
+
+
 @app.get("/ga_image/{image_filename}")
 def get_ga_image(
     request: Request, 
@@ -886,27 +1496,95 @@ def get_ga_image(
     """Serve GA image with session support."""
     try:
         sess_id = get_session_id(request, required=True, query_param=session_id)
-        session_base = get_session_base(sess_id)
-        img = session_base / "ga_images" / Path(image_filename).name
-        
-        if not img.exists():
+        if not _SAFE_IMAGE_NAME(image_filename):
+            raise HTTPException(status_code=400, detail="Invalid image name")
+        img = os.path.join(_session_dir_str(sess_id, "ga_images"), image_filename)
+
+        try:
+            st = os.stat(img)
+        except OSError:
             raise HTTPException(status_code=404, detail=f"Image not found: {image_filename}")
-        
-        return FileResponse(img, media_type="image/jpeg")
+
+        # Page URLs are reused across uploads in the same session, so
+        # rely on the ETag/Last-Modified FileResponse derives from the
+        # stat (a 304 revalidation per page) rather than telling the
+        # browser the bytes never change; the prepared stat_result
+        # still saves FileResponse its own stat call.
+        return FileResponse(
+            img,
+            media_type="image/jpeg",
+            stat_result=st,
+            headers={"Cache-Control": "no-cache"},
+        )
     except HTTPException:
         raise
     except Exception as e:
-        print(f"❌ Error serving image: {e}")
+        logger.exception("Error serving image")
         raise HTTPException(status_code=500, detail=f"Error serving image: {str(e)}")
 
 
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+def _iter_file_range(path, start: int, length: int, chunk_size: int = 1 << 20):
+    """Yield a byte range of a file in bounded chunks."""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
 @app.get("/ga/{filename}")
 def get_ga_pdf(request: Request, filename: str):
-    session_base = get_session_base(get_session_id(request))
-    ga_file = session_base / "ga" / Path(filename).name
-    if not ga_file.exists():
+    if not _SAFE_PDF_NAME(filename):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    ga_file = os.path.join(_session_dir_str(get_session_id(request), "ga"), filename)
+    # One stat covers the existence check, the size, and FileResponse
+    try:
+        st = os.stat(ga_file)
+    except OSError:
         raise HTTPException(status_code=404, detail="GA file not found")
-    return FileResponse(ga_file, media_type="application/pdf")
+    file_size = st.st_size
+    range_header = request.headers.get("range", "")
+    match = _RANGE_RE.fullmatch(range_header.strip()) if range_header else None
+
+    # Honor Range requests so the PDF viewer can seek in a 50 MB GA
+    # without re-downloading the whole file.
+    if match and match.group(1):
+        start = int(match.group(1))
+        end = int(match.group(2)) if match.group(2) else file_size - 1
+        end = min(end, file_size - 1)
+
+        if start >= file_size or end < start:
+            raise HTTPException(
+                status_code=416,
+                detail="Requested range not satisfiable",
+                headers={"Content-Range": f"bytes */{file_size}"},
+            )
+
+        length = end - start + 1
+        return StreamingResponse(
+            _iter_file_range(ga_file, start, length),
+            status_code=206,
+            media_type="application/pdf",
+            headers={
+                "Accept-Ranges": "bytes",
+                "Content-Length": str(length),
+                "Content-Range": f"bytes {start}-{end}/{file_size}",
+            },
+        )
+
+    return FileResponse(
+        ga_file,
+        media_type="application/pdf",
+        stat_result=st,
+        headers={"Accept-Ranges": "bytes"},
+    )
 
 # ===============================
 # RUN SERVER
@@ -919,4 +1597,20 @@ if __name__ == "__main__":
     print(f"📁 Base data dir: {BASE_DATA_DIR}")
     print(f"📁 Global cache dir: {GLOBAL_CACHE_DIR}")
 
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Prefer the C event loop and HTTP parser when installed; uvicorn's
+    # "auto" would also pick them, but being explicit keeps the fallback
+    # visible. Workers stay at 1: job state (processing_jobs, the status
+    # manager, the in-flight map) lives in this process, and the heavy
+    # lifting already runs in the GA worker pool.
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "auto"
+    try:
+        import httptools  # noqa: F401
+        http = "httptools"
+    except ImportError:
+        http = "auto"
+
+    uvicorn.run(app, host="0.0.0.0", port=8000, loop=loop, http=http)
\ No newline at end of file
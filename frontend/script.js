@@ -706,31 +706,64 @@ function showNotification(message, type = "info") {
   }
 }
 
+/* ================= GA CACHE PROBE ================= */
+async function probeGACache(file) {
+  // Hash the PDF locally with the server's pinned cache algorithm
+  // (SHA-256, advertised via X-Cache-Hash-Algo) and probe by hash —
+  // on a hit the cached results attach without uploading the file.
+  try {
+    const digest = await crypto.subtle.digest("SHA-256", await file.arrayBuffer());
+    const hash = [...new Uint8Array(digest)]
+      .map(b => b.toString(16).padStart(2, "0"))
+      .join("");
+
+    const head = await fetch(`${API}/cache/ga/${hash}`, { method: "HEAD" });
+    if (!head.ok) return null;
+
+    console.log("⚡ Cache hit by hash, attaching without upload");
+    const r = await fetch(`${API}/attach/ga/${hash}`, {
+      method: "POST",
+      headers: { "X-Session-ID": SESSION_ID }
+    });
+    if (!r.ok) return null;
+
+    return await r.json();
+  } catch (error) {
+    console.warn("⚠️ Cache probe failed, falling back to upload:", error);
+    return null;
+  }
+}
+
 /* ================= GA UPLOAD WITH CACHE + RESUME ================= */
 async function uploadGA() {
   const file = document.getElementById("gaFile").files[0];
   if (!file) return alert("Select GA file");
 
   console.log("🔍 Checking GA status...");
-  
+
   try {
-    const fd = new FormData();
-    fd.append("file", file);
-    
-    const r = await fetch(`${API}/upload/ga`, {
-      method: "POST",
-      headers: {
-        "X-Session-ID": SESSION_ID
-      },
-      body: fd
-    });
-    
-    if (!r.ok) {
-      throw new Error(`HTTP ${r.status}: ${r.statusText}`);
+    // Hash-first probe: a global cache hit skips the upload entirely
+    let data = await probeGACache(file);
+
+    if (!data) {
+      const fd = new FormData();
+      fd.append("file", file);
+
+      const r = await fetch(`${API}/upload/ga`, {
+        method: "POST",
+        headers: {
+          "X-Session-ID": SESSION_ID
+        },
+        body: fd
+      });
+
+      if (!r.ok) {
+        throw new Error(`HTTP ${r.status}: ${r.statusText}`);
+      }
+
+      data = await r.json();
     }
-    
-    const data = await r.json();
-    
+
     // Case 1: Complete cache exists
     if (data.status === "cached") {
       console.log("✅ Complete cache found");